@@ -0,0 +1,241 @@
+"""Нагрузочный прогон ядра трекера против локальной заглушки.
+
+Поднимает benchmarks/stub_server.py (или использует --server), затем для
+каждого размера списка валют запускает TrackerCore.refresh в фоновом
+потоке, как update_currencies в интерфейсе, а главный поток изображает
+цикл Tk: раз в кадр забирает тики из UpdateBus и меряет, насколько
+позже срока он проснулся. Каждый размер прогоняется трижды: cold -
+первая загрузка, revalidate - кэш сброшен, заглушка отвечает 304,
+stale - курсы устарели и обновляются в фоне (stale-while-revalidate).
+Если одновременных запросов к заглушке в какой-то фазе было больше
+PER_HOST_LIMIT, прогон завершается с кодом 1.
+
+    python benchmarks/load.py --sizes 10,100,1000 --latency 0.1 --fail-rate 0.05
+"""
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from currency_tracker.bulk import parse_json_rates  # noqa: E402
+from currency_tracker.bus import UpdateBus  # noqa: E402
+from currency_tracker.core import MINFIN_LAYOUT, TrackerCore  # noqa: E402
+from currency_tracker.providers import FeedProvider, PageProvider  # noqa: E402
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class StubTrackerCore(TrackerCore):
+    """TrackerCore, который ходит в заглушку вместо Minfin.
+
+    Заглушка локальная, поэтому лимит запросов к хосту по умолчанию
+    фактически снят, чтобы прогон мерил ядро, а не ожидание жетонов.
+    """
+
+    HOST_RATE = 100000
+    HOST_BURST = 100000
+
+    def __init__(self, base_url, feed=False, host_rate=None, host_burst=None, **kwargs):
+        self.base_url = base_url.rstrip('/')
+        self.use_feed = feed
+        if host_rate:
+            self.HOST_RATE = host_rate
+        if host_burst:
+            self.HOST_BURST = host_burst
+        super().__init__(**kwargs)
+
+    def default_providers(self, bulk_source):
+        providers = []
+        if self.use_feed:
+            providers.append(FeedProvider(self.http, self.base_url + '/rates.json', parse_json_rates,
+                                          ttl=self.RATE_TTL / 2, name='stub-feed'))
+        providers.append(PageProvider(self.http, self.extractor, self.base_url + '/currency/{code}/',
+                                      MINFIN_LAYOUT, name='stub-page'))
+        return providers
+
+
+def proc_status(field):
+    """Поле /proc/self/status (Linux), например VmRSS или Threads"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def thread_count():
+    threads = proc_status('Threads')
+    return threads if threads is not None else threading.active_count()
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux - КБ, macOS - байты
+    return peak / 1024 / (1024 if sys.platform == 'darwin' else 1)
+
+
+def server_stats(base_url):
+    with urllib.request.urlopen(base_url.rstrip('/') + '/stats', timeout=30) as response:
+        return json.loads(response.read())
+
+
+def drive(core, bus, codes, frame):
+    """refresh в фоне и цикл "интерфейса" в этом потоке"""
+    result = {}
+
+    def work():
+        result.update(done=core.refresh(codes))
+        # Устаревшие курсы догружаются в фоне уже после refresh
+        while core.rate_cache.pending():
+            time.sleep(0.01)
+
+    worker = threading.Thread(target=work, daemon=True)
+    lags = []
+    applied = 0
+    threads = thread_count()
+    started = time.perf_counter()
+    worker.start()
+    expected = started + frame
+    while worker.is_alive() or len(bus):
+        time.sleep(max(expected - time.perf_counter(), 0))
+        now = time.perf_counter()
+        lags.append(now - expected)
+        applied += len(bus.drain())
+        threads = max(threads, thread_count())
+        expected = now + frame
+    wall = time.perf_counter() - started
+    worker.join()
+    lags.sort()
+    return {
+        'wall_s': wall,
+        'ticks': applied,
+        'lag_p50_ms': lags[len(lags) // 2] * 1000 if lags else 0.0,
+        'lag_p99_ms': lags[min(int(len(lags) * 0.99), len(lags) - 1)] * 1000 if lags else 0.0,
+        'lag_max_ms': lags[-1] * 1000 if lags else 0.0,
+        'threads_peak': threads
+    }
+
+
+def run_size(base_url, size, feed, frame, verbose=False, host_rate=None, host_burst=None):
+    codes = [f'c{i:04d}' for i in range(size)]
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        core = StubTrackerCore(base_url, feed, host_rate, host_burst,
+                               history_path=os.path.join(directory, 'history.sqlite3'))
+        bus = UpdateBus()
+        core.add_listener(lambda tick: bus.post(('rate', tick.code), tick))
+        core.set_codes(codes)
+        try:
+            for phase in ('cold', 'revalidate', 'stale'):
+                if phase == 'revalidate':
+                    core.rate_cache.invalidate()
+                elif phase == 'stale':
+                    core.rate_cache.ttl = 0
+                before = server_stats(base_url)
+                # Сообщения ядра о сбоях загрузки при --fail-rate забили бы таблицу
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(sys.stdout if verbose else devnull):
+                    row = drive(core, bus, codes, frame)
+                after = server_stats(base_url)
+                row.update(
+                    size=size,
+                    phase=phase,
+                    codes_ok=sum(1 for code in codes if core.rate_cache.peek(code)),
+                    server=dict({name: after[name] - before[name] for name in after},
+                                concurrent_peak=after['concurrent_peak']),
+                    rss_peak_mb=peak_rss_mb(),
+                    rss_now_mb=(proc_status('VmRSS') or 0) / 1024 or None
+                )
+                rows.append(row)
+        finally:
+            core.close()
+    return rows
+
+
+def start_server(args, feed_size):
+    command = [
+        sys.executable, os.path.join(ROOT, 'benchmarks', 'stub_server.py'),
+        '--latency', str(args.latency), '--jitter', str(args.jitter),
+        '--fail-rate', str(args.fail_rate), '--burst-every', str(args.burst_every),
+        '--burst-length', str(args.burst_length), '--page-kb', str(args.page_kb),
+        '--feed-size', str(feed_size)
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    return process, process.stdout.readline().strip()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон трекера против заглушки")
+    parser.add_argument('--sizes', default='10,100,1000', help="размеры списка валют через запятую")
+    parser.add_argument('--server', help="адрес уже запущенной заглушки")
+    parser.add_argument('--feed', action='store_true', help="сначала сводный фид /rates.json, потом страницы")
+    parser.add_argument('--frame-ms', type=float, default=50, help="кадр цикла интерфейса, как UI_FRAME_MS")
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--burst-every', type=float, default=0)
+    parser.add_argument('--burst-length', type=float, default=0)
+    parser.add_argument('--page-kb', type=int, default=30)
+    parser.add_argument('--host-rate', type=float, help="лимит запросов в секунду к хосту (TrackerCore.HOST_RATE)")
+    parser.add_argument('--host-burst', type=int, help="запас жетонов лимита (TrackerCore.HOST_BURST)")
+    parser.add_argument('--output', help="сохранить результаты в JSON")
+    parser.add_argument('--verbose', action='store_true', help="не скрывать сообщения ядра об ошибках")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    process = None
+    base_url = args.server
+    if base_url is None:
+        process, base_url = start_server(args, max(sizes))
+    print(f"Заглушка: {base_url}")
+    print(f"{'валют':>6} {'фаза':<11}{'время, с':>9}{'кодов/с':>9}{'курсов':>8}{'лаг p50':>9}"
+          f"{'p99':>8}{'max, мс':>9}{'потоков':>9}{'RSS пик, МБ':>13}{'304':>6}{'сбоев':>7}{'одновр.':>9}")
+    rows = []
+    try:
+        for size in sizes:
+            for row in run_size(base_url, size, args.feed, args.frame_ms / 1000, args.verbose,
+                                args.host_rate, args.host_burst):
+                rows.append(row)
+                rss = f"{row['rss_peak_mb']:.0f}" if row['rss_peak_mb'] else "—"
+                print(f"{row['size']:>6} {row['phase']:<11}{row['wall_s']:>9.2f}{row['size'] / row['wall_s']:>9.0f}"
+                      f"{row['codes_ok']:>8}{row['lag_p50_ms']:>9.1f}{row['lag_p99_ms']:>8.1f}{row['lag_max_ms']:>9.1f}"
+                      f"{row['threads_peak']:>9}{rss:>13}{row['server']['not_modified']:>6}{row['server']['failures']:>7}"
+                      f"{row['server']['concurrent_peak']:>9}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'rows': rows,
+                       'lag_p99_ms_median': statistics.median(row['lag_p99_ms'] for row in rows)},
+                      f, ensure_ascii=False, indent=2)
+
+    limit = StubTrackerCore.PER_HOST_LIMIT
+    exceeded = [row for row in rows if row['server']['concurrent_peak'] > limit]
+    for row in exceeded:
+        print(f"{row['size']} валют, {row['phase']}: {row['server']['concurrent_peak']} одновременных запросов "
+              f"при PER_HOST_LIMIT = {limit}", file=sys.stderr)
+    return 1 if exceeded else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
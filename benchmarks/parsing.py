@@ -0,0 +1,276 @@
+"""Офлайн-бенчмарк извлечения курса из страниц.
+
+Страницы прогоняются через PriceExtractor.find, как в PageProvider, для
+каждого бэкенда разбора и каждой стратегии порядка правил. Отчёт:
+страниц в секунду, p50/p99 времени разбора и пик выделенной памяти на
+страницу (tracemalloc, отдельным проходом).
+
+Корпус по умолчанию - синтетический (генерируется детерминированно и так
+и подписывается в отчёте); настоящие сохранённые страницы:
+
+    python benchmarks/parsing.py --record fixtures/ --codes usd,eur,pln
+    python benchmarks/parsing.py --corpus fixtures/ --save-baseline parse-baseline.json
+    python benchmarks/parsing.py --corpus fixtures/ --baseline parse-baseline.json --max-regression 15
+
+С --baseline код выхода 1, если какая-то комбинация стала медленнее
+больше чем на --max-regression процентов.
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from currency_tracker.core import MINFIN_LAYOUT, MINFIN_URL  # noqa: E402
+from currency_tracker.parse import BACKENDS, RULES, PriceExtractor  # noqa: E402
+
+# Как на странице расположен курс: (название, шаблон блока с курсом)
+LAYOUTS = (
+    ('data-currency', '<div data-currency="{code}" class="mfz-rate"><span>{price:.4f}</span> грн</div>'),
+    ('posr', '<div class="mfm-posr"><b>Курс</b> {price:.4f}</div>'),
+    ('table', '<table class="rates"><tr><th>Покупка</th><th>Продажа</th></tr><tr><td>{price:.4f}</td><td>{price:.4f}</td></tr></table>'),
+    ('fallback', '<div class="currency-rate-value">{price:.4f}</div>'),
+    # Числа в скриптах и стилях внутри блока курса курсом не считаются
+    ('script-inside', '<div data-currency="{code}"><script>var a = 12.34;</script><span>{price:.4f}</span></div>'),
+    ('style-inside', '<div data-currency="{code}"><style>.rate {{ width: 12.5px }}</style><span>{price:.4f}</span></div>'),
+    ('missing', '<div class="empty">Курс временно недоступен</div>')
+)
+
+FILLER_BLOCKS = (
+    '<nav class="menu"><ul>' + ''.join(f'<li><a href="/section/{i}/">Раздел {i}</a></li>' for i in range(12)) + '</ul></nav>',
+    '<script type="application/json">{json}</script>',
+    '<article class="news"><h3>Новость {n}</h3><p>Текст новости {n} с цифрами 2024 и 15 процентов.</p></article>',
+    '<div class="banner" data-slot="{n}"><img src="/img/{n}.png" alt=""></div>',
+    '<table class="deposits"><tr><td>Банк {n}</td><td>12%</td><td>3 мес.</td></tr></table>'
+)
+
+
+def synthetic_page(rng, layout, code, price, size):
+    """Страница размером около size байт: много разметки и скриптов, курс в первой трети"""
+    template = dict(LAYOUTS)[layout]
+    blocks = []
+    total = 0
+    target_before = size // 3
+    n = 0
+    price_block = template.format(code=code, price=price)
+    while total < size:
+        if total >= target_before and price_block:
+            blocks.append(price_block)
+            price_block = None
+            continue
+        block = rng.choice(FILLER_BLOCKS).format(
+            n=n, json=json.dumps({'id': n, 'values': [rng.random() for _ in range(20)]})
+        )
+        blocks.append(block)
+        total += len(block)
+        n += 1
+    return f'<!DOCTYPE html><html><head><title>{code.upper()}</title></head><body>' + ''.join(blocks) + '</body></html>'
+
+
+def synthetic_corpus(count, page_kb, seed=1):
+    """Список (имя, html, ожидаемый курс) со смесью раскладок"""
+    rng = random.Random(seed)
+    weights = (5, 2, 1, 1, 1, 1, 1)
+    corpus = []
+    for i in range(count):
+        layout = rng.choices([name for name, _ in LAYOUTS], weights)[0]
+        price = round(rng.uniform(1.5, 80), 4)
+        html = synthetic_page(rng, layout, f'c{i}', price, page_kb * 1024)
+        corpus.append((f'synthetic-{i}-{layout}', html, None if layout == 'missing' else price))
+    return corpus
+
+
+def load_corpus(directory):
+    """Сохранённые страницы *.html / *.html.gz; ожидаемый курс берётся из *.json рядом, если есть"""
+    corpus = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if name.endswith('.html.gz'):
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                html = f.read()
+        elif name.endswith('.html'):
+            with open(path, 'r', encoding='utf-8') as f:
+                html = f.read()
+        else:
+            continue
+        expected = None
+        meta_path = path.split('.html')[0] + '.json'
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                expected = json.load(f).get('price')
+        corpus.append((name, html, expected))
+    return corpus
+
+
+def record(directory, codes):
+    """Сохранение живых страниц Minfin для последующих прогонов"""
+    from currency_tracker.session import HttpSession
+
+    os.makedirs(directory, exist_ok=True)
+    http = HttpSession()
+    extractor = PriceExtractor()
+    try:
+        for code in codes:
+            html = http.fetch(MINFIN_URL.format(code=code), lambda text: text)
+            stamp = time.strftime('%Y%m%d')
+            base = os.path.join(directory, f'minfin-{code}-{stamp}')
+            with gzip.open(base + '.html.gz', 'wt', encoding='utf-8') as f:
+                f.write(html)
+            with open(base + '.json', 'w', encoding='utf-8') as f:
+                json.dump({'code': code, 'url': MINFIN_URL.format(code=code),
+                           'price': extractor.extract(html, MINFIN_LAYOUT)}, f, ensure_ascii=False)
+            print(f"{code}: {len(html) / 1024:.0f} КБ")
+    finally:
+        http.close()
+
+
+def available_backends():
+    backends = {}
+    for name, backend in BACKENDS.items():
+        try:
+            backend()
+        except ImportError:
+            continue
+        backends[name] = backend
+    if 'soup' in backends:
+        # BeautifulSoup со встроенным html.parser вместо lxml
+        backends['soup-html.parser'] = lambda: BACKENDS['soup']('html.parser')
+    return backends
+
+
+def make_finder(backend_factory, strategy):
+    """Функция html -> price для стратегии порядка правил.
+
+    adaptive - PriceExtractor с запоминанием удачного селектора (как в трекере),
+    static - правила всегда в порядке RULES.
+    """
+    if strategy == 'adaptive':
+        extractor = PriceExtractor(backend_factory())
+        return lambda html: extractor.find(html, MINFIN_LAYOUT)[1]
+    backend = backend_factory()
+    return lambda html: backend.find(html, RULES)[1]
+
+
+def percentile(sorted_values, q):
+    index = min(int(round(q * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def measure(finder, corpus, repeat):
+    durations = []
+    wrong = 0
+    for _ in range(repeat):
+        for name, html, expected in corpus:
+            started = time.perf_counter()
+            price = finder(html)
+            durations.append(time.perf_counter() - started)
+            if expected is not None and price != expected:
+                wrong += 1
+    durations.sort()
+
+    # Память - отдельным проходом, tracemalloc сильно замедляет разбор
+    peaks = []
+    tracemalloc.start()
+    try:
+        for name, html, expected in corpus:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            finder(html)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'pages_per_sec': len(durations) / sum(durations),
+        'p50_ms': percentile(durations, 0.5) * 1000,
+        'p99_ms': percentile(durations, 0.99) * 1000,
+        'alloc_peak_kb': statistics.mean(peaks) / 1024,
+        'wrong': wrong // repeat
+    }
+
+
+def compare(results, baseline, max_regression):
+    """Строки о регрессиях против сохранённого прогона"""
+    failures = []
+    for key, result in results.items():
+        before = baseline.get(key)
+        if not before:
+            continue
+        slower = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100
+        fewer = (before['pages_per_sec'] - result['pages_per_sec']) / before['pages_per_sec'] * 100
+        if slower > max_regression or fewer > max_regression:
+            failures.append(f"{key}: p50 {slower:+.1f}%, страниц/с {-fewer:+.1f}%")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк извлечения курса со страниц")
+    parser.add_argument('--corpus', help="каталог с сохранёнными страницами (*.html, *.html.gz)")
+    parser.add_argument('--pages', type=int, default=50, help="страниц в синтетическом корпусе")
+    parser.add_argument('--page-kb', type=int, default=150, help="размер синтетической страницы, КБ")
+    parser.add_argument('--repeat', type=int, default=3, help="прогонов корпуса на комбинацию")
+    parser.add_argument('--backend', action='append', help="только эти бэкенды (можно несколько раз)")
+    parser.add_argument('--strategy', action='append', choices=('adaptive', 'static'))
+    parser.add_argument('--baseline', help="JSON прошлого прогона для проверки регрессий")
+    parser.add_argument('--max-regression', type=float, default=20.0, help="допустимое замедление, %%")
+    parser.add_argument('--save-baseline', help="сохранить результаты как JSON")
+    parser.add_argument('--record', metavar='DIR', help="сохранить живые страницы Minfin в DIR и выйти")
+    parser.add_argument('--codes', default='usd,eur', help="коды для --record через запятую")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        record(args.record, [code.strip().lower() for code in args.codes.split(',') if code.strip()])
+        return 0
+
+    if args.corpus:
+        corpus = load_corpus(args.corpus)
+        source = f"сохранённые страницы из {args.corpus}"
+    else:
+        corpus = synthetic_corpus(args.pages, args.page_kb)
+        source = f"СИНТЕТИЧЕСКИЙ корпус ({args.pages} стр. по ~{args.page_kb} КБ), не настоящие страницы Minfin"
+    if not corpus:
+        print("Корпус пуст", file=sys.stderr)
+        return 2
+
+    backends = available_backends()
+    names = args.backend or list(backends)
+    strategies = args.strategy or ['adaptive', 'static']
+    print(f"Корпус: {source}")
+    print(f"{'бэкенд':<18}{'стратегия':<10}{'стр/с':>9}{'p50, мс':>10}{'p99, мс':>10}{'пик КБ/стр':>12}{'ошибок':>8}")
+
+    results = {}
+    for name in names:
+        if name not in backends:
+            print(f"{name}: недоступен", file=sys.stderr)
+            continue
+        for strategy in strategies:
+            result = measure(make_finder(backends[name], strategy), corpus, args.repeat)
+            results[f'{name}/{strategy}'] = result
+            print(f"{name:<18}{strategy:<10}{result['pages_per_sec']:>9.1f}{result['p50_ms']:>10.2f}"
+                  f"{result['p99_ms']:>10.2f}{result['alloc_peak_kb']:>12.0f}{result['wrong']:>8}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump({'source': source, 'results': results}, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        failures = compare(results, baseline, args.max_regression)
+        if failures:
+            print(f"Регрессия больше {args.max_regression:g}%:", file=sys.stderr)
+            for line in failures:
+                print(f"  {line}", file=sys.stderr)
+            return 1
+        print(f"Регрессий больше {args.max_regression:g}% нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""Замер времени запуска трекера.
+
+Каждый этап меряется в свежем интерпретаторе во временном каталоге со
+списком из --codes валют и журналом курсов, так что сеть не трогается:
+
+    python benchmarks/startup.py --runs 10 --output startup.jsonl
+
+С --output результат дописывается JSON-строкой и сравнивается с прошлой
+записью, чтобы отслеживать время запуска между релизами.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Код этапов для дочернего процесса; печатает {"этап": секунды}
+CHILD = r'''
+import json, os, sys, time
+phase = sys.argv[1]
+result = {}
+start = time.perf_counter()
+if phase == 'core':
+    from currency_tracker.core import TrackerCore, load_watchlist
+    from currency_tracker.persist import PriceJournal
+    result['import_core'] = time.perf_counter() - start
+    start = time.perf_counter()
+    currencies = load_watchlist(journal=PriceJournal('prices.journal'))
+    core = TrackerCore()
+    core.set_codes([c['code'] for c in currencies])
+    result['core_init'] = time.perf_counter() - start
+    core.close()
+else:
+    import project
+    result['import_project'] = time.perf_counter() - start
+    if phase == 'gui':
+        start = time.perf_counter()
+        root = project.tb.Window(themename="darkly")
+        # Без первой загрузки курсов: меряем только показ окна из кэша
+        project.CurrencyTracker.STARTUP_REFRESH_MS = 3600 * 1000
+        app = project.CurrencyTracker(root)
+        root.update()
+        result['first_paint'] = time.perf_counter() - start
+        app.watchlist_saver.close()
+        app.core.close()
+        root.destroy()
+print(json.dumps(result))
+'''
+
+
+def has_display():
+    if sys.platform.startswith('win') or sys.platform == 'darwin':
+        return True
+    return bool(os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+
+def seed(directory, count):
+    """Список валют и журнал курсов, как после прошлого запуска"""
+    codes = [f'c{i:03d}' for i in range(count)]
+    codes[0] = 'usd'
+    with open(os.path.join(directory, 'currencies.json'), 'w', encoding='utf-8') as f:
+        json.dump({'currencies': [{'code': code, 'name': code.upper()} for code in codes]}, f)
+    with open(os.path.join(directory, 'prices.journal'), 'w', encoding='utf-8') as f:
+        for i, code in enumerate(codes):
+            f.write(f"{code} {40 + i * 0.01!r} {40.5 + i * 0.01!r}\n")
+
+
+def run_phase(phase, directory):
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD, phase],
+        cwd=directory, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result[f'{phase}_process'] = time.perf_counter() - start
+    return result
+
+
+def import_profile(directory, top):
+    """Самые долгие импорты project по -X importtime (накопительно, мс)"""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import project'],
+        cwd=directory, env=env, capture_output=True, text=True, check=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]) / 1000, parts[2].strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def last_record(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = [line for line in f if line.strip()]
+        return json.loads(lines[-1]) if lines else None
+    except (OSError, ValueError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замер времени запуска трекера")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--codes', type=int, default=20, help="валют в списке")
+    parser.add_argument('--output', help="дописать результат в JSONL-файл и сравнить с прошлым")
+    parser.add_argument('--importtime', type=int, default=0, metavar='N', help="показать N самых долгих импортов")
+    parser.add_argument('--no-gui', action='store_true', help="не мерять показ окна")
+    args = parser.parse_args(argv)
+
+    phases = ['core', 'import']
+    if not args.no_gui:
+        if has_display():
+            phases.append('gui')
+        else:
+            print("Нет дисплея - показ окна не меряется", file=sys.stderr)
+
+    samples = {}
+    with tempfile.TemporaryDirectory() as directory:
+        seed(directory, args.codes)
+        for _ in range(args.runs):
+            for phase in phases:
+                for name, value in run_phase(phase, directory).items():
+                    samples.setdefault(name, []).append(value)
+        profile = import_profile(directory, args.importtime) if args.importtime else []
+
+    record = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'runs': args.runs,
+        'codes': args.codes,
+        'metrics': {
+            name: {'median': statistics.median(values), 'min': min(values), 'max': max(values)}
+            for name, values in sorted(samples.items())
+        }
+    }
+
+    previous = last_record(args.output) if args.output else None
+    print(f"{'этап':<20}{'медиана, мс':>14}{'мин, мс':>10}{'изменение':>12}")
+    for name, metric in record['metrics'].items():
+        change = ''
+        if previous and name in previous.get('metrics', {}):
+            before = previous['metrics'][name]['median']
+            change = f"{(metric['median'] - before) / before * 100:+.1f}%" if before else ''
+        print(f"{name:<20}{metric['median'] * 1000:>14.1f}{metric['min'] * 1000:>10.1f}{change:>12}")
+    for elapsed, module in profile:
+        print(f"  {elapsed:8.1f} мс  {module}")
+
+    if args.output:
+        with open(args.output, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""Локальная замена сайта курсов для нагрузочных прогонов.
+
+Отдаёт похожие на Minfin страницы /currency/<code>/ и JSON-фид /rates.json
+(формат НБУ) для любых кодов. Задержка, доля ошибок, серии сбоев и
+частота смены курса настраиваются; на If-None-Match с прежним ETag
+отвечает 304. /stats - счётчики ответов и пик одновременных запросов
+с прошлого чтения /stats.
+
+    python benchmarks/stub_server.py --port 8765 --latency 0.2 --fail-rate 0.05
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from parsing import synthetic_page  # noqa: E402
+
+
+class StubState:
+    """Настройки и счётчики заглушки"""
+
+    def __init__(self, latency=0.05, jitter=0.02, fail_rate=0.0, burst_every=0, burst_length=0,
+                 change_every=60, page_kb=30, feed_size=1000, seed=1):
+        self.latency = latency
+        self.jitter = jitter
+        self.fail_rate = fail_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.change_every = change_every
+        self.page_kb = page_kb
+        self.feed_size = feed_size
+        self.started = time.time()
+        self.counters = {'pages': 0, 'feeds': 0, 'not_modified': 0, 'failures': 0}
+        self.active = 0
+        self.peak = 0
+        self._rng = random.Random(seed)
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def version(self):
+        return int(time.time() // self.change_every) if self.change_every else 0
+
+    def price(self, code, version):
+        """Курс кода: своя база и небольшой сдвиг на каждой версии"""
+        base = 5 + zlib.crc32(code.encode()) % 9000 / 100
+        return round(base * (1 + ((version * 7919 + zlib.crc32(code.encode())) % 200 - 100) / 10000), 4)
+
+    def page(self, code, version):
+        key = (code, version)
+        with self._lock:
+            page = self._pages.get(key)
+        if page is None:
+            rng = random.Random(zlib.crc32(code.encode()))
+            page = synthetic_page(rng, 'data-currency', code, self.price(code, version), self.page_kb * 1024).encode()
+            with self._lock:
+                # Старые версии страниц не нужны
+                if len(self._pages) > 4 * self.feed_size:
+                    self._pages.clear()
+                self._pages[key] = page
+        return page
+
+    def delay(self):
+        with self._lock:
+            return max(self._rng.gauss(self.latency, self.jitter), 0)
+
+    def should_fail(self):
+        if self.burst_every and (time.time() - self.started) % self.burst_every < self.burst_length:
+            return True
+        with self._lock:
+            return self._rng.random() < self.fail_rate
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def enter(self):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    def leave(self):
+        with self._lock:
+            self.active -= 1
+
+    def stats(self):
+        """Счётчики и пик одновременных запросов, пик начинается заново"""
+        with self._lock:
+            stats = dict(self.counters, concurrent_peak=self.peak)
+            self.peak = self.active
+        return stats
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, body, content_type, etag=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        state = self.state
+        if self.path == '/stats':
+            self.send_body(200, json.dumps(state.stats()).encode(), 'application/json')
+            return
+        state.enter()
+        try:
+            self.respond(state)
+        finally:
+            state.leave()
+
+    def respond(self, state):
+        time.sleep(state.delay())
+        if state.should_fail():
+            state.count('failures')
+            self.send_body(503, b'unavailable', 'text/plain')
+            return
+
+        version = state.version()
+        parts = [part for part in self.path.split('?')[0].split('/') if part]
+        if parts == ['rates.json']:
+            etag = f'"feed-{version}"'
+        elif len(parts) == 2 and parts[0] == 'currency':
+            code = parts[1].lower()
+            etag = f'"{code}-{version}"'
+        else:
+            self.send_body(404, b'not found', 'text/plain')
+            return
+
+        if self.headers.get('If-None-Match') == etag:
+            state.count('not_modified')
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        if parts == ['rates.json']:
+            state.count('feeds')
+            codes = [f'c{i:04d}' for i in range(state.feed_size)]
+            body = json.dumps([{'cc': code.upper(), 'rate': state.price(code, version)} for code in codes]).encode()
+            self.send_body(200, body, 'application/json', etag)
+        else:
+            state.count('pages')
+            self.send_body(200, state.page(code, version), 'text/html; charset=utf-8', etag)
+
+
+def serve(host='127.0.0.1', port=0, **options):
+    """Сервер в фоновом потоке; возвращает (server, state), адрес - server.server_address"""
+    state = StubState(**options)
+    handler = type('BoundStubHandler', (StubHandler,), {'state': state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Заглушка сайта курсов")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0, help="0 - любой свободный")
+    parser.add_argument('--latency', type=float, default=0.05, help="средняя задержка ответа, сек")
+    parser.add_argument('--jitter', type=float, default=0.02, help="разброс задержки, сек")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="доля ответов 503")
+    parser.add_argument('--burst-every', type=float, default=0, help="серия сбоев раз в столько секунд")
+    parser.add_argument('--burst-length', type=float, default=0, help="длительность серии сбоев, сек")
+    parser.add_argument('--change-every', type=float, default=60, help="как часто меняется курс, сек")
+    parser.add_argument('--page-kb', type=int, default=30)
+    parser.add_argument('--feed-size', type=int, default=1000, help="кодов в /rates.json")
+    args = parser.parse_args(argv)
+
+    server, state = serve(
+        args.host, args.port,
+        latency=args.latency, jitter=args.jitter, fail_rate=args.fail_rate,
+        burst_every=args.burst_every, burst_length=args.burst_length,
+        change_every=args.change_every, page_kb=args.page_kb, feed_size=args.feed_size
+    )
+    host, port = server.server_address[:2]
+    print(f"http://{host}:{port}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,4 @@
+"""Ядро Currency Tracker Pro: загрузка, разбор и хранение курсов валют.
+
+Модули пакета не зависят от Tkinter, интерфейс живёт в project.py.
+"""
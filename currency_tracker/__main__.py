@@ -0,0 +1,162 @@
+"""Трекер курсов без интерфейса.
+
+Опрашивает валюты из currencies.json и пишет тики в stdout или файл:
+
+    python -m currency_tracker --format csv --output ticks.csv
+    python -m currency_tracker --once
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from .alerts import KINDS, describe
+from .bulk import BULK_SOURCES
+from .core import CURRENCIES_PATH, TrackerCore, load_watchlist, read_watchlist
+from .persist import atomic_write
+from .providers import FileProvider
+
+
+class TickWriter:
+    """Потокобезопасный вывод тиков в JSON Lines или CSV"""
+
+    FIELDS = ('code', 'price', 'last_price', 'ts', 'time', 'sma', 'ema', 'std', 'min', 'max', 'stale')
+    STATS = ('sma', 'ema', 'std', 'min', 'max')
+
+    def __init__(self, stream, fmt='jsonl', header=True):
+        self.stream = stream
+        self.fmt = fmt
+        self._lock = threading.Lock()
+        self._csv = csv.writer(stream) if fmt == 'csv' else None
+        if self._csv and header:
+            self._csv.writerow(self.FIELDS)
+            stream.flush()
+
+    def __call__(self, tick):
+        row = {
+            'code': tick.code,
+            'price': tick.price,
+            'last_price': tick.last_price,
+            'ts': tick.fetched_at,
+            'time': datetime.fromtimestamp(tick.fetched_at, timezone.utc).isoformat()
+        }
+        stats = tick.stats or {}
+        for field in self.STATS:
+            row[field] = stats.get(field)
+        # Источник недоступен, это последний известный курс
+        row['stale'] = tick.stale
+        with self._lock:
+            if self._csv:
+                self._csv.writerow([row[field] for field in self.FIELDS])
+            else:
+                self.stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+            self.stream.flush()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m currency_tracker', description="Трекер курсов без интерфейса")
+    parser.add_argument('--watchlist', default=CURRENCIES_PATH, help="файл со списком валют")
+    parser.add_argument('--history', default=TrackerCore.HISTORY_PATH, help="файл истории SQLite")
+    parser.add_argument('--format', choices=('jsonl', 'csv'), default='jsonl')
+    parser.add_argument('--output', help="файл для тиков (дописывается), по умолчанию stdout")
+    parser.add_argument('--bulk-source', choices=sorted(BULK_SOURCES) + ['none'], default=TrackerCore.BULK_SOURCE,
+                        help="сводный источник курсов; none - только страницы валют")
+    parser.add_argument('--rates-file', help="брать курсы только из локального JSON/CSV-файла (без сети)")
+    parser.add_argument('--once', action='store_true', help="одно обновление и выход")
+    parser.add_argument('--cross', action='store_true', help="с --once: вывести матрицу кросс-курсов JSON-строкой")
+    parser.add_argument('--add-alert', nargs=3, action='append', default=[], metavar=('CODE', 'KIND', 'VALUE'),
+                        help=f"добавить правило оповещения, KIND: {', '.join(KINDS)}")
+    parser.add_argument('--metrics', help="файл метрик, обновляется вместе со списком валют: "
+                                          "*.json - JSON, иначе текстовый формат Prometheus")
+    parser.add_argument('--reload', type=float, default=5.0, help="как часто проверять изменения списка валют (сек)")
+    return parser.parse_args(argv)
+
+
+def watchlist_codes(path, previous=None):
+    """Коды из списка валют.
+
+    Если передан previous, а файла нет или он испорчен (например, его как раз
+    переписывают), возвращается previous и файл не трогается.
+    """
+    if previous is not None:
+        try:
+            if read_watchlist(path) is None:
+                return previous
+        except (OSError, ValueError) as e:
+            print(f"Помилка завантаження {path}: {e}. Список валют не змінено.", file=sys.stderr)
+            return previous
+    return [currency['code'] for currency in load_watchlist(path)]
+
+
+def watchlist_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def write_metrics(core, path):
+    fmt = 'json' if path.endswith('.json') else 'prometheus'
+    try:
+        atomic_write(path, core.export_metrics(fmt))
+    except OSError as e:
+        print(f"Помилка запису метрик: {e}", file=sys.stderr)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.output:
+        header = not os.path.exists(args.output) or os.path.getsize(args.output) == 0
+        stream = open(args.output, 'a', encoding='utf-8', newline='')
+    else:
+        header = True
+        stream = sys.stdout
+
+    bulk_source = None if args.bulk_source == 'none' else args.bulk_source
+    providers = [FileProvider(args.rates_file)] if args.rates_file else None
+    core = TrackerCore(history_path=args.history, bulk_source=bulk_source, providers=providers)
+    core.add_listener(TickWriter(stream, args.format, header=header))
+    # Оповещения - в stderr, чтобы не смешивать с тиками
+    core.alerts.listeners.append(lambda alert: print(f"ALERT {describe(alert)}", file=sys.stderr, flush=True))
+    try:
+        for code, kind, value in args.add_alert:
+            core.alerts.add_rule(code.lower(), kind, value)
+        codes = watchlist_codes(args.watchlist)
+        mtime = watchlist_mtime(args.watchlist)
+        core.set_codes(codes)
+        core.refresh(codes)
+        if args.once:
+            if args.cross and core.cross is not None:
+                stream.write(json.dumps({'cross': core.cross.snapshot(['uah'] + codes)}, ensure_ascii=False) + '\n')
+            return 0
+
+        core.start_scheduler()
+        while True:
+            time.sleep(args.reload)
+            if args.metrics:
+                write_metrics(core, args.metrics)
+            # Список валют поменяли - новые коды загружаем сразу
+            current = watchlist_mtime(args.watchlist)
+            if current != mtime:
+                mtime = current
+                new_codes = watchlist_codes(args.watchlist, sorted(core.tracked_codes))
+                added = [code for code in new_codes if code not in core.tracked_codes]
+                core.set_codes(new_codes)
+                if added:
+                    core.refresh(added)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        if args.metrics:
+            write_metrics(core, args.metrics)
+        core.close()
+        if stream is not sys.stdout:
+            stream.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
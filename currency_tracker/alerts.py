@@ -0,0 +1,151 @@
+"""Оповещения о курсах: пороги выше/ниже и резкое изменение в процентах.
+
+Правила каждой валюты лежат в отсортированных по порогу списках, поэтому
+на тике проверяются только пороги между прошлым и новым курсом (bisect),
+а не все правила подряд.
+"""
+import bisect
+import threading
+from collections import namedtuple
+
+AlertRule = namedtuple('AlertRule', ['id', 'code', 'kind', 'value'])
+# Сработавшее правило
+Alert = namedtuple('Alert', ['rule', 'price', 'last_price', 'ts'])
+
+# above/below - курс пересёк порог снизу вверх/сверху вниз,
+# move - курс изменился за тик не меньше чем на value процентов
+KINDS = ('above', 'below', 'move')
+
+_LOW = float('-inf')
+_HIGH = float('inf')
+
+
+class AlertEngine:
+    """Индекс правил по кодам валют.
+
+    Правила и сработавшие оповещения хранятся в HistoryStore, если он
+    передан. Одно правило срабатывает не чаще раза в debounce секунд.
+    Одинаковые (code, kind, value) - одно правило, повторное добавление
+    возвращает уже существующее.
+    """
+
+    def __init__(self, store=None, debounce=300):
+        self.store = store
+        self.debounce = debounce
+        self.listeners = []
+        self._rules = {}
+        # code -> kind -> отсортированный список (value, rule_id)
+        self._index = {}
+        self._fired = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        if store is not None:
+            for rule in store.alert_rules():
+                rule = AlertRule(*rule)
+                # Повторы, сохранённые раньше, сработали бы несколько раз
+                if self._find(rule.code, rule.kind, rule.value) is not None:
+                    store.remove_alert_rule(rule.id)
+                    continue
+                self._insert(rule)
+
+    def _find(self, code, kind, value):
+        """Правило с таким же порогом или None"""
+        entries = self._index.get(code, {}).get(kind, ())
+        i = bisect.bisect_left(entries, (value, _LOW))
+        if i < len(entries) and entries[i][0] == value:
+            return self._rules[entries[i][1]]
+        return None
+
+    def _insert(self, rule):
+        kinds = self._index.setdefault(rule.code, {kind: [] for kind in KINDS})
+        bisect.insort(kinds[rule.kind], (rule.value, rule.id))
+        self._rules[rule.id] = rule
+        self._next_id = max(self._next_id, rule.id + 1)
+
+    def add_rule(self, code, kind, value):
+        if kind not in KINDS:
+            raise ValueError(f"Неизвестный тип оповещения: {kind}")
+        value = float(value)
+        with self._lock:
+            rule = self._find(code, kind, value)
+            if rule is not None:
+                return rule
+            if self.store is not None:
+                rule_id = self.store.add_alert_rule(code, kind, value)
+            else:
+                rule_id = self._next_id
+            rule = AlertRule(rule_id, code, kind, value)
+            self._insert(rule)
+        return rule
+
+    def remove_rule(self, rule_id):
+        with self._lock:
+            rule = self._rules.pop(rule_id, None)
+            if rule is None:
+                return
+            entries = self._index[rule.code][rule.kind]
+            del entries[bisect.bisect_left(entries, (rule.value, rule.id))]
+            self._fired.pop(rule_id, None)
+        if self.store is not None:
+            self.store.remove_alert_rule(rule_id)
+
+    def rules(self, code=None):
+        with self._lock:
+            return sorted(
+                (rule for rule in self._rules.values() if code is None or rule.code == code),
+                key=lambda rule: (rule.code, rule.kind, rule.value)
+            )
+
+    def _crossed(self, kinds, price, last_price):
+        """id правил, чьи пороги лежат между last_price и price"""
+        if price > last_price:
+            entries = kinds['above']
+            lo = bisect.bisect_right(entries, (last_price, _HIGH))
+            hi = bisect.bisect_right(entries, (price, _HIGH))
+        else:
+            entries = kinds['below']
+            lo = bisect.bisect_left(entries, (price, _LOW))
+            hi = bisect.bisect_left(entries, (last_price, _LOW))
+        ids = [rule_id for _, rule_id in entries[lo:hi]]
+
+        if last_price:
+            move = abs(price - last_price) / last_price * 100
+            entries = kinds['move']
+            ids += [rule_id for _, rule_id in entries[:bisect.bisect_right(entries, (move, _HIGH))]]
+        return ids
+
+    def check(self, code, price, last_price, ts):
+        """Проверка тика; возвращает сработавшие оповещения"""
+        if last_price is None or price == last_price:
+            return []
+
+        fired = []
+        with self._lock:
+            kinds = self._index.get(code)
+            if kinds is None:
+                return []
+            for rule_id in self._crossed(kinds, price, last_price):
+                last = self._fired.get(rule_id)
+                if last is not None and ts - last < self.debounce:
+                    continue
+                self._fired[rule_id] = ts
+                fired.append(Alert(self._rules[rule_id], price, last_price, ts))
+
+        for alert in fired:
+            if self.store is not None:
+                self.store.record_alert(alert)
+            for listener in self.listeners:
+                listener(alert)
+        return fired
+
+
+def describe(alert):
+    """Текст оповещения для интерфейса и журнала"""
+    rule = alert.rule
+    code = rule.code.upper()
+    if rule.kind == 'above':
+        return f"{code} выше {rule.value:.2f}: {alert.price:.2f}"
+    if rule.kind == 'below':
+        return f"{code} ниже {rule.value:.2f}: {alert.price:.2f}"
+    change = (alert.price - alert.last_price) / alert.last_price * 100
+    return f"{code} изменился на {change:+.2f}% (порог {rule.value:g}%): {alert.price:.2f}"
@@ -0,0 +1,109 @@
+"""Скользящая статистика курса: SMA, EMA, стандартное отклонение, мин/макс.
+
+Каждая метрика обновляется за O(1) (амортизированно) на тик: среднее и
+дисперсия - по Уэлфорду с удалением выпавшего из окна значения, минимум и
+максимум - монотонными деками.
+"""
+import math
+import threading
+from collections import deque
+
+
+class RollingStats:
+    """Статистика по последним window тикам одной валюты"""
+
+    def __init__(self, window=20, ema_span=None):
+        self.window = window
+        self.alpha = 2 / ((ema_span or window) + 1)
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.ema = None
+        self.seq = 0
+        # (номер тика, значение): у минимумов значения растут, у максимумов убывают
+        self.mins = deque()
+        self.maxs = deque()
+
+    def _add(self, x):
+        n = len(self.values)
+        delta = x - self.mean
+        self.mean += delta / n
+        self.m2 += delta * (x - self.mean)
+
+    def _remove(self, y):
+        n = len(self.values)
+        if n == 0:
+            self.mean = self.m2 = 0.0
+            return
+        old = self.mean
+        self.mean = (old * (n + 1) - y) / n
+        self.m2 = max(self.m2 - (y - old) * (y - self.mean), 0.0)
+
+    def update(self, x):
+        """Добавление тика, возвращает снимок статистики"""
+        self.values.append(x)
+        self._add(x)
+        if len(self.values) > self.window:
+            self._remove(self.values.popleft())
+
+        self.ema = x if self.ema is None else self.ema + self.alpha * (x - self.ema)
+
+        seq = self.seq
+        self.seq += 1
+        while self.mins and self.mins[-1][1] >= x:
+            self.mins.pop()
+        self.mins.append((seq, x))
+        while self.maxs and self.maxs[-1][1] <= x:
+            self.maxs.pop()
+        self.maxs.append((seq, x))
+        oldest = seq - self.window + 1
+        if self.mins[0][0] < oldest:
+            self.mins.popleft()
+        if self.maxs[0][0] < oldest:
+            self.maxs.popleft()
+        return self.snapshot()
+
+    def snapshot(self):
+        count = len(self.values)
+        return {
+            'count': count,
+            'sma': self.mean,
+            'ema': self.ema,
+            'std': math.sqrt(self.m2 / (count - 1)) if count > 1 else 0.0,
+            'min': self.mins[0][1] if self.mins else None,
+            'max': self.maxs[0][1] if self.maxs else None
+        }
+
+
+class RollingAnalytics:
+    """RollingStats по кодам валют.
+
+    loader(code, count) при первом тике кода возвращает предыдущие курсы,
+    чтобы после перезапуска статистика не начиналась с нуля.
+    """
+
+    def __init__(self, window=20, ema_span=None, loader=None):
+        self.window = window
+        self.ema_span = ema_span
+        self.loader = loader
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def update(self, code, price):
+        with self._lock:
+            stats = self._stats.get(code)
+            if stats is None:
+                stats = self._stats[code] = RollingStats(self.window, self.ema_span)
+                if self.loader:
+                    for value in self.loader(code, self.window):
+                        stats.update(float(value))
+            return stats.update(price)
+
+    def get(self, code):
+        with self._lock:
+            stats = self._stats.get(code)
+            return stats.snapshot() if stats else None
+
+    def discard(self, code):
+        with self._lock:
+            self._stats.pop(code, None)
@@ -0,0 +1,219 @@
+"""Загрузка исторических курсов из файлов в HistoryStore.
+
+CSV и JSON Lines (в том числе .gz) читаются потоком по chunk_size строк.
+Каждая пачка проверяется и очищается от повторов векторно, сортируется
+по (code, ts) и пишется одной транзакцией; повторы уже записанных тиков
+отсекает INSERT OR IGNORE. Память ограничена размером пачки.
+
+    python -m currency_tracker.backfill rates-2023.csv.gz rates-2024.jsonl
+    python -m currency_tracker.backfill usd.csv --code usd --time-column date --price-column rate
+
+Тики старше TrackerCore.HISTORY_MAX_AGE трекер всё равно удалит при
+запуске, а старше HISTORY_DOWNSAMPLE_AFTER проредит до одного в час.
+Поэтому по умолчанию импорт делает то же сам, пачками, а не одной
+долгой транзакцией при следующем запуске трекера (--keep-all - оставить всё).
+"""
+import argparse
+import csv
+import gzip
+import json
+import sys
+import time
+from itertools import islice
+
+import numpy as np
+
+from .convert import parse_numbers, parse_times
+from .core import TrackerCore
+from .parse import MAX_PRICE, MIN_PRICE
+from .store import HistoryStore
+
+
+class HistoryImporter:
+    """Потоковый импорт тиков (code, ts, price) в HistoryStore.
+
+    Если в файле одна валюта и нет колонки кода, её задаёт code. Тики
+    раньше since пропускаются, а раньше downsample_before прореживаются
+    до последнего на интервал bucket, как в HistoryStore.apply_retention.
+    """
+
+    def __init__(self, store, code_column='code', time_column='ts', price_column='price', code=None,
+                 chunk_size=100000, since=None, downsample_before=None, bucket=3600):
+        self.store = store
+        self.code_column = code_column
+        self.time_column = time_column
+        self.price_column = price_column
+        self.code = code.lower() if code else None
+        self.chunk_size = chunk_size
+        self.since = since
+        self.downsample_before = downsample_before
+        self.bucket = bucket
+        self.counters = {'rows': 0, 'invalid': 0, 'expired': 0, 'duplicates': 0, 'downsampled': 0, 'inserted': 0}
+
+    def import_columns(self, codes, times, prices):
+        """Проверка, очистка и запись пачки; возвращает число новых тиков"""
+        count = len(prices)
+        if self.code:
+            names, ids = np.array([self.code]), np.zeros(count, dtype=np.intp)
+        else:
+            # Нормализуются только различные значения, строки дальше - номера кодов
+            raw, inverse = np.unique(np.array(['' if code is None else str(code) for code in codes]), return_inverse=True)
+            names, canonical = np.unique([code.strip().lower() for code in raw.tolist()], return_inverse=True)
+            ids = canonical[inverse]
+        times = parse_times(times)
+        prices = parse_numbers(prices)
+
+        valid = np.isfinite(times) & np.isfinite(prices) & (prices > MIN_PRICE) & (prices < MAX_PRICE) & (names[ids] != '')
+        self.counters['rows'] += count
+        self.counters['invalid'] += int(count - valid.sum())
+        if self.since is not None:
+            fresh = times >= self.since
+            self.counters['expired'] += int((valid & ~fresh).sum())
+            valid &= fresh
+        ids, times, prices = ids[valid], times[valid], prices[valid]
+        if not len(prices):
+            return 0
+
+        # Сортировка по (code, ts) устойчивая: из повторов остаётся первый в файле,
+        # а упорядоченная вставка быстрее для индекса (code, ts)
+        order = np.lexsort((times, ids))
+        ids, times, prices = ids[order], times[order], prices[order]
+        first = np.ones(len(prices), dtype=bool)
+        first[1:] = (ids[1:] != ids[:-1]) | (times[1:] != times[:-1])
+        self.counters['duplicates'] += int(len(first) - first.sum())
+        ids, times, prices = ids[first], times[first], prices[first]
+
+        if self.downsample_before is not None:
+            # Из старых тиков остаётся последний в каждом (code, интервал bucket)
+            old = times < self.downsample_before
+            buckets = np.floor(times / self.bucket)
+            last = np.ones(len(times), dtype=bool)
+            last[:-1] = (ids[1:] != ids[:-1]) | (buckets[1:] != buckets[:-1]) | ~old[1:]
+            keep = ~old | last
+            self.counters['downsampled'] += int(len(keep) - keep.sum())
+            ids, times, prices = ids[keep], times[keep], prices[keep]
+
+        inserted = self.store.append_many(zip(names[ids].tolist(), times.tolist(), prices.tolist()))
+        self.counters['inserted'] += inserted
+        return inserted
+
+    def _index(self, header, name):
+        if name not in header:
+            raise ValueError(f"В файле нет колонки {name}")
+        return header.index(name)
+
+    def import_csv(self, source):
+        reader = csv.reader(source)
+        header = next(reader, None)
+        if header is None:
+            return
+        header = [name.strip() for name in header]
+        code_index = None if self.code else self._index(header, self.code_column)
+        time_index = self._index(header, self.time_column)
+        price_index = self._index(header, self.price_column)
+        while True:
+            chunk = list(islice(reader, self.chunk_size))
+            if not chunk:
+                break
+            # Пустые строки пропускаются, а короткие считаются некорректными:
+            # zip обрезал бы по ним все колонки пачки
+            rows = [row for row in chunk if len(row) >= len(header)]
+            short = sum(1 for row in chunk if row) - len(rows)
+            self.counters['rows'] += short
+            self.counters['invalid'] += short
+            if not rows:
+                continue
+            # Транспонирование строк в колонки без цикла на Python
+            columns = list(zip(*rows))
+            self.import_columns(None if self.code else columns[code_index],
+                                columns[time_index], columns[price_index])
+
+    def import_jsonl(self, source):
+        lines = (line for line in source if line.strip())
+        while True:
+            rows = [json.loads(line) for line in islice(lines, self.chunk_size)]
+            if not rows:
+                break
+            codes = None if self.code else [row.get(self.code_column) for row in rows]
+            self.import_columns(codes, [row.get(self.time_column) for row in rows],
+                                [row.get(self.price_column) for row in rows])
+
+    def import_file(self, path, fmt=None):
+        """Импорт файла; формат по расширению (.csv, .jsonl, с .gz или без)"""
+        name = path.lower()
+        plain = name[:-3] if name.endswith('.gz') else name
+        fmt = fmt or ('csv' if plain.endswith('.csv') else 'jsonl')
+        opener = gzip.open if name.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8', newline='') as source:
+            if fmt == 'csv':
+                self.import_csv(source)
+            else:
+                self.import_jsonl(source)
+        return self.counters
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m currency_tracker.backfill',
+        description="Импорт истории курсов",
+        epilog="Как и трекер, импорт хранит тики не дольше года, а подробные тики старше "
+               "30 дней не сохраняет: от них остаётся последний тик в каждом часе."
+    )
+    parser.add_argument('inputs', nargs='+', help="CSV или JSON Lines, можно .gz")
+    parser.add_argument('--format', choices=('csv', 'jsonl'), help="формат входа, по умолчанию по расширению")
+    parser.add_argument('--history', default=TrackerCore.HISTORY_PATH, help="файл истории SQLite")
+    parser.add_argument('--code', help="код валюты, если в файле одна валюта без колонки кода")
+    parser.add_argument('--code-column', default='code')
+    parser.add_argument('--time-column', default='ts', help="секунды эпохи или дата ISO 8601 (без зоны - UTC)")
+    parser.add_argument('--price-column', default='price')
+    parser.add_argument('--chunk-size', type=int, default=100000)
+    parser.add_argument('--keep-all', action='store_true',
+                        help="не пропускать и не прореживать старые тики (трекер сделает это при запуске)")
+    args = parser.parse_args(argv)
+
+    store = HistoryStore(args.history)
+    now = time.time()
+    importer = HistoryImporter(
+        store,
+        code_column=args.code_column,
+        time_column=args.time_column,
+        price_column=args.price_column,
+        code=args.code,
+        chunk_size=args.chunk_size,
+        since=None if args.keep_all else now - TrackerCore.HISTORY_MAX_AGE,
+        downsample_before=None if args.keep_all else now - TrackerCore.HISTORY_DOWNSAMPLE_AFTER
+    )
+    started = time.perf_counter()
+    removed = 0
+    try:
+        for path in args.inputs:
+            importer.import_file(path, args.format)
+        if not args.keep_all:
+            # Пачки прорежены по отдельности; доводим вместе с уже записанной историей
+            removed = store.apply_retention(
+                max_age=TrackerCore.HISTORY_MAX_AGE,
+                downsample_after=TrackerCore.HISTORY_DOWNSAMPLE_AFTER,
+                now=now
+            )
+    except (OSError, ValueError) as e:
+        print(f"Помилка імпорту: {e}", file=sys.stderr)
+        return 1
+    finally:
+        store.close()
+
+    elapsed = time.perf_counter() - started
+    counters = importer.counters
+    print(
+        f"Рядків: {counters['rows']}, нових тиків: {counters['inserted']}, "
+        f"вже були: {counters['rows'] - counters['invalid'] - counters['expired'] - counters['duplicates'] - counters['downsampled'] - counters['inserted']}, "
+        f"повторів у файлі: {counters['duplicates']}, некоректних: {counters['invalid']}, "
+        f"застарілих: {counters['expired']}, проріджено: {counters['downsampled']} "
+        f"({counters['rows'] / elapsed:.0f} рядків/с)"
+        + (f", видалено з історії при прорідженні: {removed}" if removed else ""),
+        file=sys.stderr
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
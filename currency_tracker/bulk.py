@@ -0,0 +1,144 @@
+"""Курсы всех валют одним запросом.
+
+Вместо отдельной страницы на каждую валюту загружается одна сводная
+страница (или JSON/CSV-источник) и за один проход из неё достаются курсы
+всех найденных кодов.
+"""
+import csv
+import io
+import json
+import re
+import threading
+import time
+from html.parser import HTMLParser
+
+from .parse import price_in_text
+
+CODE_RE = re.compile(r'\b[A-Z]{3}\b')
+CODE_HREF_RE = re.compile(r'/currency/([a-z]{3})/')
+
+
+class _RateTableScanner(HTMLParser):
+    """Строки таблиц: код валюты в ячейке (или в ссылке) и курс в следующих ячейках"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rates = {}
+        self.row = None
+        self.cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'tr':
+            self._end_row()
+            self.row = []
+        elif tag in ('td', 'th') and self.row is not None:
+            self.cell = {'text': [], 'code': None}
+            self.row.append(self.cell)
+        elif tag == 'a' and self.cell is not None and not self.cell['code']:
+            match = CODE_HREF_RE.search(dict(attrs).get('href') or '')
+            if match:
+                self.cell['code'] = match.group(1)
+
+    def handle_endtag(self, tag):
+        if tag in ('tr', 'table'):
+            self._end_row()
+        elif tag in ('td', 'th'):
+            self.cell = None
+
+    def handle_data(self, data):
+        if self.cell is not None:
+            self.cell['text'].append(data)
+
+    def _end_row(self):
+        row, self.row, self.cell = self.row, None, None
+        if not row:
+            return
+        for i, cell in enumerate(row):
+            code = cell['code']
+            if not code:
+                match = CODE_RE.search(''.join(cell['text']))
+                code = match.group().lower() if match else None
+            if not code:
+                continue
+            if code not in self.rates:
+                for other in row[i + 1:]:
+                    price = price_in_text(''.join(other['text']))
+                    if price is not None:
+                        self.rates[code] = price
+                        break
+            return
+
+    def scan(self, html):
+        self.feed(html)
+        self.close()
+        self._end_row()
+        return self.rates
+
+
+def parse_rate_table(html):
+    """Курсы из таблиц сводной HTML-страницы: {code: price}"""
+    return _RateTableScanner().scan(html)
+
+
+def parse_json_rates(text, code_key='cc', rate_key='rate'):
+    """Курсы из JSON: список объектов [{"cc": "USD", "rate": 41.2}, ...]
+    (как у НБУ) или словарь {"usd": 41.2}, в том числе внутри {"rates": {...}}"""
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get('rates', data)
+        items = data.items() if isinstance(data, dict) else []
+    else:
+        items = ((item.get(code_key), item.get(rate_key)) for item in data if isinstance(item, dict))
+    rates = {}
+    for code, rate in items:
+        if isinstance(code, str) and isinstance(rate, (int, float)) and not isinstance(rate, bool):
+            rates[code.lower()] = float(rate)
+    return rates
+
+
+def parse_csv_rates(text, code_column='code', rate_column='rate'):
+    """Курсы из CSV с колонками code и rate"""
+    rates = {}
+    for row in csv.DictReader(io.StringIO(text)):
+        try:
+            rates[row[code_column].strip().lower()] = float(row[rate_column].replace(',', '.'))
+        except (KeyError, AttributeError, ValueError):
+            continue
+    return rates
+
+
+BULK_SOURCES = {
+    'minfin': ('https://minfin.com.ua/currency/', parse_rate_table),
+    'nbu': ('https://bank.gov.ua/NBUStatService/v1/statdirectory/exchange?json', parse_json_rates)
+}
+
+
+class BulkRates:
+    """Снимок курсов всех валют из одного источника.
+
+    Снимок живёт ttl секунд; параллельные запросы, пришедшие за устаревшим
+    снимком, ждут одну общую загрузку. Ошибка загрузки пробрасывается
+    вызвавшему, а до конца ttl источник считается пустым.
+    """
+
+    def __init__(self, http, url, parse, ttl=30):
+        self.http = http
+        self.url = url
+        self.parse = parse
+        self.ttl = ttl
+        self._rates = {}
+        self._fetched_at = None
+        self._lock = threading.Lock()
+
+    def rates(self):
+        with self._lock:
+            if self._fetched_at is None or time.time() - self._fetched_at >= self.ttl:
+                # После ошибки тоже ждём ttl, чтобы не дёргать источник на каждый код
+                self._fetched_at = time.time()
+                self._rates = {}
+                self._rates = self.http.fetch(self.url, self.parse) or {}
+            return self._rates
+
+    def get(self, code):
+        """Курс кода из снимка или None, если источник его не знает"""
+        return self.rates().get(code.lower())
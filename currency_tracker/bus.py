@@ -0,0 +1,48 @@
+"""Очередь обновлений интерфейса между потоками загрузки и Tk"""
+import threading
+from collections import namedtuple
+from itertools import islice
+
+# Снимок нового курса для интерфейса; stats - скользящая статистика (analytics),
+# stale - источник недоступен и это последний известный курс
+RateTick = namedtuple(
+    'RateTick', ['code', 'price', 'last_price', 'fetched_at', 'stats', 'stale'], defaults=(None, False)
+)
+
+
+class UpdateBus:
+    """Потокобезопасная очередь обновлений с объединением по ключу.
+
+    Фоновые потоки публикуют неизменяемые снимки через post(), поток Tk
+    забирает их через drain(). Если ключ опубликован повторно раньше, чем
+    его забрали, остаётся только последний снимок.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.posted = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+    def post(self, key, value):
+        with self._lock:
+            if key in self._pending:
+                self.coalesced += 1
+            self._pending[key] = value
+            self.posted += 1
+
+    def drain(self, limit=None):
+        """Забрать до limit самых старых обновлений как список (key, value)"""
+        with self._lock:
+            if limit is None or limit >= len(self._pending):
+                batch = list(self._pending.items())
+                self._pending = {}
+            else:
+                batch = list(islice(self._pending.items(), limit))
+                for key, _ in batch:
+                    del self._pending[key]
+        return batch
@@ -0,0 +1,130 @@
+"""Кэш курсов с TTL, stale-while-revalidate и объединением запросов"""
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+
+# value - курс, fetched_at - время загрузки (epoch), stale - курс устарел,
+# failed - последняя загрузка не удалась и отдаётся последний известный курс
+CachedRate = namedtuple('CachedRate', ['value', 'fetched_at', 'stale', 'failed'], defaults=(False,))
+
+
+class RateCache:
+    """Кэш курсов по коду валюты.
+
+    Свежий курс (моложе ttl) отдаётся без запроса. Устаревший, но моложе
+    ttl + stale_ttl, отдаётся сразу, а обновление уходит в фон. Если
+    загрузка не удалась, последний курс отдаётся с failed=True до следующей
+    удачной. Параллельные запросы одного кода ждут одну общую загрузку.
+    С metrics (Metrics) исходы запросов считаются в cache_requests_total.
+
+    submit(code, func) запускает фоновое обновление, например в пуле
+    FetchEngine.run с его ограничениями; без него - отдельный поток.
+    """
+
+    def __init__(self, loader, ttl=60, stale_ttl=600, on_refresh=None, metrics=None, submit=None):
+        self.loader = loader
+        self.submit = submit
+        self.metrics = metrics
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.on_refresh = on_refresh
+        self._entries = {}
+        self._inflight = {}
+        # Коды, загрузка которых уже идёт, а не ждёт очереди пула
+        self._running = set()
+        self._lock = threading.Lock()
+
+    def get(self, code):
+        """Курс кода как CachedRate или None, если загрузить не удалось"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(code)
+            if entry:
+                age = now - entry.fetched_at
+                if age < self.ttl:
+                    self._count('hit')
+                    return entry
+                if age < self.ttl + self.stale_ttl:
+                    if code not in self._inflight:
+                        self._start(code, background=True)
+                    self._count('stale')
+                    return entry._replace(stale=True)
+            future = self._inflight.get(code)
+            leader = future is None
+            if leader:
+                future = self._start(code)
+            elif code not in self._running:
+                # Фоновое обновление ещё ждёт в очереди пула - загружаем сами
+                leader = True
+            if leader:
+                self._running.add(code)
+        self._count('miss' if leader else 'coalesced')
+        if leader:
+            self._load(code, future)
+        return future.result()
+
+    def _count(self, result):
+        if self.metrics is not None:
+            self.metrics.inc('cache_requests_total', result=result)
+
+    def _start(self, code, background=False):
+        future = Future()
+        self._inflight[code] = future
+        if background:
+            if self.submit is None:
+                threading.Thread(target=self._revalidate, args=(code, future), daemon=True).start()
+                return future
+            try:
+                self.submit(code, lambda code: self._revalidate(code, future))
+            except RuntimeError:
+                # Пул уже остановлен
+                del self._inflight[code]
+        return future
+
+    def _revalidate(self, code, future):
+        with self._lock:
+            # Пока задача ждала в очереди, загрузку мог забрать запрос курса
+            if self._inflight.get(code) is not future or code in self._running:
+                return
+            self._running.add(code)
+        self._load(code, future, background=True)
+
+    def _load(self, code, future, background=False):
+        try:
+            value = self.loader(code)
+        except Exception as e:
+            print(f"Помилка отримання курсу {code}: {e}")
+            value = None
+        with self._lock:
+            if value is not None:
+                entry = CachedRate(value, time.time(), False)
+                self._entries[code] = entry
+            else:
+                entry = self._entries.get(code)
+                if entry:
+                    entry = entry._replace(failed=True)
+                    self._entries[code] = entry
+                    entry = entry._replace(stale=True)
+            del self._inflight[code]
+            self._running.discard(code)
+        future.set_result(entry)
+        if background and value is not None and self.on_refresh:
+            self.on_refresh(code, entry)
+
+    def pending(self):
+        """Число незаконченных загрузок, включая ждущие в очереди"""
+        with self._lock:
+            return len(self._inflight)
+
+    def peek(self, code):
+        """Курс из кэша без загрузки"""
+        with self._lock:
+            return self._entries.get(code)
+
+    def invalidate(self, code=None):
+        with self._lock:
+            if code is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(code, None)
@@ -0,0 +1,242 @@
+"""Пересчёт больших выписок (CSV / JSON Lines) в гривну.
+
+Файл читается потоком по chunk_size строк, курсы для каждой пачки
+подбираются векторно (np.searchsorted по истории кода), результат
+дописывается сразу, поэтому память не зависит от размера файла.
+
+    python -m currency_tracker.convert ledger.csv -o ledger_uah.csv
+    python -m currency_tracker.convert ledger.jsonl -o out.jsonl --time-column date
+"""
+import argparse
+import csv
+import json
+import sys
+from datetime import datetime, timezone
+from itertools import islice
+
+import numpy as np
+
+from .cross import BASE
+from .store import HistoryStore
+
+
+def parse_numbers(values):
+    """Строки в float64, нечисловые - NaN"""
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        result = np.full(len(values), np.nan)
+        for i, value in enumerate(values):
+            try:
+                result[i] = float(value)
+            except (TypeError, ValueError):
+                pass
+        return result
+
+
+def parse_times(values):
+    """Время строк в секунды эпохи: числа как есть, даты ISO 8601 (без зоны - UTC).
+
+    Пустое и неразборчивое время - NaN.
+    """
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        pass
+    try:
+        moments = np.asarray(values, dtype='datetime64[s]')
+    except (TypeError, ValueError):
+        pass
+    else:
+        # Пустое время разбирается в NaT, а его float - огромное отрицательное число
+        result = moments.astype(np.float64)
+        result[np.isnat(moments)] = np.nan
+        return result
+    result = np.full(len(values), np.nan)
+    for i, value in enumerate(values):
+        try:
+            result[i] = float(value)
+        except (TypeError, ValueError):
+            try:
+                moment = datetime.fromisoformat(str(value))
+            except ValueError:
+                continue
+            # Как и в векторном разборе: время без зоны - UTC, а не местное
+            if moment.tzinfo is None:
+                moment = moment.replace(tzinfo=timezone.utc)
+            result[i] = moment.timestamp()
+    return result
+
+
+class RateLookup:
+    """Курсы к гривне для пересчёта.
+
+    Текущие курсы берутся из current или последнего тика в HistoryStore,
+    исторические - как последний тик не позже времени строки. История
+    кода загружается из хранилища один раз в массивы NumPy.
+    """
+
+    def __init__(self, store=None, current=None):
+        self.store = store
+        self._current = {BASE: 1.0}
+        self._current.update(current or {})
+        self._series = {}
+
+    def current_rate(self, code):
+        if code not in self._current:
+            latest = self.store.latest(code) if self.store else None
+            self._current[code] = latest[1] if latest else np.nan
+        return self._current[code]
+
+    def series(self, code):
+        series = self._series.get(code)
+        if series is None:
+            rows = list(self.store.range(code)) if self.store else []
+            series = (np.array([row[0] for row in rows], dtype=np.float64),
+                      np.array([row[1] for row in rows], dtype=np.float64))
+            self._series[code] = series
+        return series
+
+    def rates(self, codes, times=None):
+        """Курсы для массива кодов (и времени, если пересчёт исторический)"""
+        unique, inverse = np.unique(codes, return_inverse=True)
+        if times is None:
+            return np.array([self.current_rate(code) for code in unique], dtype=np.float64)[inverse]
+
+        result = np.full(len(codes), np.nan)
+        for k, code in enumerate(unique):
+            mask = inverse == k
+            if code == BASE:
+                result[mask] = 1.0
+                continue
+            ts, prices = self.series(code)
+            if not len(ts):
+                continue
+            # Последний тик не позже времени строки; без времени курса нет
+            row_times = times[mask]
+            pos = np.searchsorted(ts, row_times, side='right') - 1
+            found = (pos >= 0) & ~np.isnan(row_times)
+            rates = np.full(len(pos), np.nan)
+            rates[found] = prices[pos[found]]
+            result[mask] = rates
+        return result
+
+
+class LedgerConverter:
+    """Потоковый пересчёт сумм выписки в гривну (или в валюту target)"""
+
+    def __init__(self, lookup, amount_column='amount', currency_column='currency', time_column=None,
+                 target=BASE, chunk_size=50000):
+        self.lookup = lookup
+        self.amount_column = amount_column
+        self.currency_column = currency_column
+        self.time_column = time_column
+        self.target = target.lower()
+        self.chunk_size = chunk_size
+        self.output_column = f"amount_{self.target}"
+        self.rate_column = f"rate_{self.target}"
+
+    def convert_columns(self, amounts, currencies, times=None):
+        """Векторный пересчёт пачки: (суммы в target, курсы)"""
+        amounts = parse_numbers(amounts)
+        codes = np.array([str(code).strip().lower() for code in currencies])
+        times = parse_times(times) if times is not None else None
+        rates = self.lookup.rates(codes, times)
+        if self.target != BASE:
+            rates = rates / self.lookup.rates(np.full(len(codes), self.target), times)
+        return amounts * rates, rates
+
+    @staticmethod
+    def _format(value):
+        return '' if np.isnan(value) else repr(round(float(value), 6))
+
+    def convert_csv(self, source, target):
+        reader = csv.reader(source)
+        header = next(reader, None)
+        if header is None:
+            return 0
+        amount_i = header.index(self.amount_column)
+        currency_i = header.index(self.currency_column)
+        time_i = header.index(self.time_column) if self.time_column else None
+        writer = csv.writer(target)
+        writer.writerow(header + [self.rate_column, self.output_column])
+
+        rows_total = 0
+        while True:
+            chunk = list(islice(reader, self.chunk_size))
+            if not chunk:
+                break
+            # Пустые строки пропускаются, короткие дополняются пустыми значениями:
+            # без суммы или валюты строка выводится с пустыми курсом и суммой
+            rows = [row + [''] * (len(header) - len(row)) if len(row) < len(header) else row
+                    for row in chunk if row]
+            times = [row[time_i] for row in rows] if time_i is not None else None
+            converted, rates = self.convert_columns(
+                [row[amount_i] for row in rows], [row[currency_i] for row in rows], times
+            )
+            writer.writerows(row + [self._format(rate), self._format(value)]
+                             for row, rate, value in zip(rows, rates, converted))
+            rows_total += len(rows)
+        return rows_total
+
+    def convert_jsonl(self, source, target):
+        lines = (line for line in source if line.strip())
+        rows_total = 0
+        while True:
+            rows = [json.loads(line) for line in islice(lines, self.chunk_size)]
+            if not rows:
+                break
+            times = [row.get(self.time_column) for row in rows] if self.time_column else None
+            converted, rates = self.convert_columns(
+                [row.get(self.amount_column) for row in rows], [row.get(self.currency_column, '') for row in rows], times
+            )
+            for row, rate, value in zip(rows, rates, converted):
+                row[self.rate_column] = None if np.isnan(rate) else float(rate)
+                row[self.output_column] = None if np.isnan(value) else round(float(value), 6)
+                target.write(json.dumps(row, ensure_ascii=False) + '\n')
+            rows_total += len(rows)
+        return rows_total
+
+    def convert_file(self, input_path, output_path=None, fmt=None):
+        """Пересчёт файла; формат по расширению (.csv или .jsonl/.json)"""
+        fmt = fmt or ('csv' if input_path.lower().endswith('.csv') else 'jsonl')
+        convert = self.convert_csv if fmt == 'csv' else self.convert_jsonl
+        with open(input_path, 'r', encoding='utf-8', newline='') as source:
+            if output_path:
+                with open(output_path, 'w', encoding='utf-8', newline='') as target:
+                    return convert(source, target)
+            return convert(source, sys.stdout)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m currency_tracker.convert', description="Пересчёт выписки в гривну")
+    parser.add_argument('input', help="CSV или JSON Lines")
+    parser.add_argument('-o', '--output', help="куда писать результат, по умолчанию stdout")
+    parser.add_argument('--format', choices=('csv', 'jsonl'), help="формат входа, по умолчанию по расширению")
+    parser.add_argument('--history', default='history.sqlite3', help="файл истории SQLite")
+    parser.add_argument('--amount-column', default='amount')
+    parser.add_argument('--currency-column', default='currency')
+    parser.add_argument('--time-column', help="колонка времени: курс берётся на момент операции, а не текущий")
+    parser.add_argument('--to', default=BASE, help="валюта результата, по умолчанию гривна")
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    args = parser.parse_args(argv)
+
+    store = HistoryStore(args.history)
+    try:
+        converter = LedgerConverter(
+            RateLookup(store),
+            amount_column=args.amount_column,
+            currency_column=args.currency_column,
+            time_column=args.time_column,
+            target=args.to,
+            chunk_size=args.chunk_size
+        )
+        rows = converter.convert_file(args.input, args.output, args.format)
+    finally:
+        store.close()
+    print(f"Перераховано рядків: {rows}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
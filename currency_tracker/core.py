@@ -0,0 +1,338 @@
+"""Ядро трекера без интерфейса: загрузка курсов, история и расписание опроса"""
+import json
+import os
+import shutil
+import threading
+import time
+
+from .alerts import AlertEngine
+from .analytics import RollingAnalytics
+from .bulk import BULK_SOURCES
+from .bus import RateTick
+from .cache import RateCache
+from .fetch import FetchEngine
+from .limits import HostGuard
+from .metrics import Metrics
+from .parse import PriceExtractor
+from .persist import atomic_write, dump_json
+from .providers import FeedProvider, PageProvider, ProviderChain
+from .ring import RateHistory
+from .scheduler import RefreshScheduler
+from .session import HttpSession
+from .store import HistoryStore
+
+try:
+    from .cross import CrossRates
+except ImportError:
+    CrossRates = None
+
+CURRENCIES_PATH = 'currencies.json'
+MINFIN_URL = "https://minfin.com.ua/currency/{code}/"
+MINFIN_LAYOUT = "minfin.com.ua"
+
+
+def read_watchlist(path=CURRENCIES_PATH):
+    """Список валют из файла или None, если файла нет; ValueError - файл испорчен"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    currencies = data.get('currencies', []) if isinstance(data, dict) else None
+    # Валидация данных
+    if not isinstance(currencies, list) or not all(
+            isinstance(currency, dict) and 'code' in currency and 'name' in currency for currency in currencies):
+        raise ValueError("немає коду або назви валюти")
+    return currencies
+
+
+def load_watchlist(path=CURRENCIES_PATH, journal=None, quarantine=False):
+    """Завантаження збережених валют; курсы из journal (PriceJournal), если он есть.
+
+    Испорченный файл не трогается, вместо него - стандартный список. С
+    quarantine его копия кладётся в path + '.bad', чтобы следующее
+    сохранение не затёрло единственный экземпляр.
+    """
+    try:
+        currencies = read_watchlist(path) or []
+    except (OSError, ValueError) as e:
+        print(f"Помилка завантаження JSON: {e}. Використовуються стандартні налаштування.")
+        currencies = []
+        if quarantine:
+            try:
+                shutil.copyfile(path, path + '.bad')
+            except OSError:
+                pass
+
+    # Если нет валют, добавляем дефолтные
+    if not currencies:
+        currencies = [
+            {'code': 'usd', 'name': 'Долар США', 'last_price': None, 'current_price': None}
+        ]
+
+    if journal is not None:
+        prices = journal.load()
+        for currency in currencies:
+            if currency['code'] in prices:
+                currency['last_price'], currency['current_price'] = prices[currency['code']]
+    return currencies
+
+
+def save_watchlist(currencies, path=CURRENCIES_PATH, with_prices=True):
+    """Збереження списку валют (атомарно, компактним JSON).
+
+    with_prices=False - только коды и названия, курсы тогда ведёт PriceJournal.
+    """
+    data = {'currencies': []}
+    for currency in currencies:
+        # Копіюємо тільки дані, без віджетів
+        currency_data = {
+            'code': currency['code'],
+            'name': currency['name']
+        }
+        if with_prices:
+            currency_data['last_price'] = currency.get('last_price')
+            currency_data['current_price'] = currency.get('current_price')
+        data['currencies'].append(currency_data)
+
+    try:
+        atomic_write(path, dump_json(data))
+    except Exception as e:
+        print(f"Помилка збереження: {e}")
+
+
+class TrackerCore:
+    """Загрузка, история и автообновление курсов без Tkinter.
+
+    Новые тики рассылаются подписчикам add_listener() как RateTick из
+    фоновых потоков; интерфейс или CLI сами решают, как их показать.
+    """
+
+    # Параллельная загрузка: всего потоков и запросов к одному хосту
+    FETCH_WORKERS = 8
+    PER_HOST_LIMIT = 4
+    # Кэш курсов: свежесть и сколько ещё можно отдавать устаревший курс (сек)
+    RATE_TTL = 60
+    RATE_STALE_TTL = 600
+    # История курсов: файл и тиков в памяти на валюту
+    HISTORY_PATH = 'history.sqlite3'
+    HISTORY_CAPACITY = 10000
+    # Хранение: старше года удаляем, старше месяца оставляем тик в час
+    HISTORY_MAX_AGE = 365 * 24 * 3600
+    HISTORY_DOWNSAMPLE_AFTER = 30 * 24 * 3600
+    # Скользящая статистика: окно в тиках и период EMA
+    ANALYTICS_WINDOW = 20
+    ANALYTICS_EMA_SPAN = 10
+    # Одно правило оповещения срабатывает не чаще раза в столько секунд
+    ALERT_DEBOUNCE = 300
+    # Автообновление: базовый, минимальный и максимальный интервал опроса (сек)
+    REFRESH_INTERVAL = 300
+    REFRESH_MIN_INTERVAL = RATE_TTL
+    REFRESH_MAX_INTERVAL = 1800
+    # Запросов в секунду к одному хосту (и запас), сбоев до отключения хоста,
+    # секунд до пробного запроса и сколько ждать свободного жетона.
+    # PER_HOST_LIMIT страниц по ~200 мс - это около 20 запросов в секунду,
+    # лимит лишь не даёт превысить этот темп, а запас вмещает обновление
+    # всего списка валют одним залпом
+    HOST_RATE = 20
+    HOST_BURST = 40
+    BREAKER_FAILURES = 5
+    BREAKER_RESET = 30
+    HOST_MAX_WAIT = 5
+    # Сводный источник курсов (ключ BULK_SOURCES) или None - только страницы валют
+    BULK_SOURCE = 'minfin'
+
+    def __init__(self, history_path=None, bulk_source=BULK_SOURCE, providers=None):
+        self.tracked_codes = frozenset()
+        # Коды, загрузка которых не удалась и для которых отдаётся последний известный курс
+        self.stale_codes = set()
+        self.listeners = []
+        self.scheduler = None
+
+        # Задержки загрузки и разбора, попадания в кэш и т.п., см. collect_metrics()
+        self.metrics = Metrics()
+        self.history_store = HistoryStore(history_path or self.HISTORY_PATH)
+        # История цен, при первом обращении подгружается из хранилища
+        self.price_history = RateHistory(
+            self.HISTORY_CAPACITY,
+            loader=lambda code: self.history_store.tail(code, self.HISTORY_CAPACITY)
+        )
+        self.apply_lock = threading.Lock()
+        # SMA, EMA, волатильность и мин/макс по окну, досчитываются на каждом тике
+        self.analytics = RollingAnalytics(
+            self.ANALYTICS_WINDOW,
+            self.ANALYTICS_EMA_SPAN,
+            loader=lambda code, count: self.price_history.view(code, count)[1]
+        )
+        # Кросс-курсы считаются из тех же тиков (нужен NumPy)
+        self.cross = CrossRates() if CrossRates else None
+        # Оповещения проверяются на каждом тике, правила хранятся рядом с историей
+        self.alerts = AlertEngine(self.history_store, self.ALERT_DEBOUNCE)
+        threading.Thread(target=self.apply_history_retention, daemon=True).start()
+
+        # Общая HTTP-сессия, разбор страниц и пул загрузки курсов
+        self.extractor = PriceExtractor(metrics=self.metrics)
+        self.http = HttpSession(
+            pool_size=self.FETCH_WORKERS,
+            guard=HostGuard(
+                rate=self.HOST_RATE,
+                burst=self.HOST_BURST,
+                failure_threshold=self.BREAKER_FAILURES,
+                reset_timeout=self.BREAKER_RESET,
+                max_wait=self.HOST_MAX_WAIT
+            )
+        )
+        # Источники курсов: свои или сводный источник и страницы Minfin
+        self.providers = ProviderChain(providers or self.default_providers(bulk_source))
+        self.rate_cache = RateCache(
+            self.get_currency_price,
+            ttl=self.RATE_TTL,
+            stale_ttl=self.RATE_STALE_TTL,
+            on_refresh=self.apply_rate,
+            metrics=self.metrics,
+            # Фоновые обновления идут через тот же пул и лимит хоста, что и обычные
+            submit=lambda code, func: self.fetch_engine.run(code, func)
+        )
+        self.fetch_engine = FetchEngine(
+            self.rate_cache.get,
+            url_func=self.currency_url,
+            max_workers=self.FETCH_WORKERS,
+            per_host_limit=self.PER_HOST_LIMIT
+        )
+
+    def add_listener(self, listener):
+        """listener(tick) вызывается из фоновых потоков для каждого нового тика"""
+        self.listeners.append(listener)
+
+    def set_codes(self, codes):
+        """Список отслеживаемых валют"""
+        self.tracked_codes = frozenset(codes)
+        if self.scheduler:
+            self.scheduler.set_codes(self.tracked_codes)
+
+    def currency_url(self, currency_code):
+        return MINFIN_URL.format(code=currency_code.lower())
+
+    def default_providers(self, bulk_source):
+        providers = []
+        if bulk_source:
+            url, parse = BULK_SOURCES[bulk_source]
+            # Снимок обновляется чаще, чем истекает кэш кода, чтобы не отдать старый курс как новый
+            providers.append(FeedProvider(self.http, url, parse, ttl=self.RATE_TTL / 2, name=bulk_source))
+        providers.append(PageProvider(self.http, self.extractor, MINFIN_URL, MINFIN_LAYOUT, name='minfin-page'))
+        return providers
+
+    def get_currency_price(self, currency_code):
+        """Отримання курсу валюти з першого справного джерела"""
+        started = time.perf_counter()
+        price = self.providers.get(currency_code)
+        self.metrics.observe('fetch_seconds', time.perf_counter() - started, code=currency_code)
+        self.metrics.inc('fetches_total', code=currency_code, result='ok' if price is not None else 'failed')
+        return price
+
+    def apply_rate(self, code, rate):
+        """Запись загруженного курса в историю и рассылка тика подписчикам.
+
+        Когда источник становится недоступен, подписчики один раз получают
+        последний известный курс с stale=True, в историю он не пишется.
+        """
+        if not rate or code not in self.tracked_codes:
+            return None
+
+        with self.apply_lock:
+            previous = self.price_history.latest(code)
+            # Результат старше уже записанного курса (его обогнала фоновая загрузка)
+            if previous and rate.fetched_at < previous[0]:
+                return None
+            was_stale = code in self.stale_codes
+            # Источник недоступен, кэш отдал последний известный курс
+            if rate.failed:
+                self.stale_codes.add(code)
+            else:
+                self.stale_codes.discard(code)
+            # Курс из кэша, который уже был учтён, повторно не записываем
+            if previous and rate.fetched_at == previous[0]:
+                if not rate.failed or was_stale:
+                    return None
+                prices = self.price_history.view(code, 2)[1]
+                tick = RateTick(code, previous[1], float(prices[0]) if len(prices) > 1 else None,
+                                previous[0], self.analytics.get(code), True)
+            else:
+                tick = None
+                # До записи в кольцо: при первом тике статистика досчитывается из истории
+                stats = self.analytics.update(code, rate.value)
+                self.price_history.append(code, rate.fetched_at, rate.value)
+        if tick is not None:
+            for listener in self.listeners:
+                listener(tick)
+            return tick
+        self.history_store.append(code, rate.fetched_at, rate.value)
+
+        # Изменение считаем от предыдущего тика истории
+        tick = RateTick(code, rate.value, previous[1] if previous else None, rate.fetched_at, stats, rate.failed)
+        if self.cross is not None:
+            self.cross.update(code, tick.price, tick.last_price)
+        self.alerts.check(code, tick.price, tick.last_price, tick.fetched_at)
+        for listener in self.listeners:
+            listener(tick)
+        return tick
+
+    def refresh(self, codes=None, on_progress=None):
+        """Загрузка курсов сейчас; блокирует до конца, on_progress(done, total)"""
+        def on_result(code, rate, done, total):
+            self.apply_rate(code, rate)
+            if on_progress:
+                on_progress(done, total)
+
+        codes = list(self.tracked_codes) if codes is None else codes
+        return self.fetch_engine.fetch_all(codes, on_result)
+
+    def start_scheduler(self, on_result=None):
+        """Автообновление по расписанию RefreshScheduler"""
+        def on_scheduled(code, rate):
+            self.apply_rate(code, rate)
+            if on_result:
+                on_result(code, rate)
+
+        self.scheduler = RefreshScheduler(
+            self.fetch_engine.submit,
+            on_scheduled,
+            base_interval=self.REFRESH_INTERVAL,
+            min_interval=self.REFRESH_MIN_INTERVAL,
+            max_interval=self.REFRESH_MAX_INTERVAL
+        )
+        self.scheduler.set_codes(self.tracked_codes)
+        self.scheduler.start()
+
+    def collect_metrics(self):
+        """Метрики с текущими значениями трафика и источников"""
+        for name, value in self.http.stats().items():
+            self.metrics.set(f'http_{name}', value)
+        for name, stats in self.providers.stats().items():
+            for field in ('hits', 'misses', 'failures'):
+                self.metrics.set(f'provider_{field}', stats[field], provider=name)
+            if stats['latency'] is not None:
+                self.metrics.set('provider_latency_seconds', stats['latency'], provider=name)
+            self.metrics.set('provider_healthy', int(stats['healthy']), provider=name)
+        self.metrics.set('tracked_codes', len(self.tracked_codes))
+        return self.metrics
+
+    def export_metrics(self, fmt='prometheus'):
+        """Снимок метрик текстом: prometheus или json"""
+        metrics = self.collect_metrics()
+        return metrics.to_json() if fmt == 'json' else metrics.to_prometheus()
+
+    def apply_history_retention(self):
+        try:
+            self.history_store.apply_retention(
+                max_age=self.HISTORY_MAX_AGE,
+                downsample_after=self.HISTORY_DOWNSAMPLE_AFTER
+            )
+        except Exception as e:
+            print(f"Помилка очищення історії: {e}")
+
+    def close(self):
+        if self.scheduler:
+            self.scheduler.stop()
+        self.fetch_engine.shutdown()
+        self.history_store.close()
+        self.http.close()
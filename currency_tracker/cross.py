@@ -0,0 +1,89 @@
+"""Кросс-курсы всех отслеживаемых валют из их котировок к гривне"""
+import threading
+
+import numpy as np
+
+BASE = 'uah'
+
+
+class CrossRates:
+    """Матрица кросс-курсов.
+
+    Котировки к гривне лежат вектором (NaN - курса ещё нет), гривна - 1.
+    matrix[i, j] = q[i] / q[j] - сколько единиц валюты j стоит единица
+    валюты i, вся матрица считается одним np.divide.outer. Матрица
+    изменений сравнивает её с матрицей на предыдущих тиках тех же валют.
+    """
+
+    def __init__(self, capacity=64):
+        self._codes = [BASE]
+        self._index = {BASE: 0}
+        self._current = np.full(capacity, np.nan)
+        self._previous = np.full(capacity, np.nan)
+        self._current[0] = self._previous[0] = 1.0
+        self._cached = None
+        self._lock = threading.Lock()
+
+    def _slot(self, code):
+        i = self._index.get(code)
+        if i is None:
+            i = len(self._codes)
+            if i == len(self._current):
+                self._current = np.concatenate([self._current, np.full(i, np.nan)])
+                self._previous = np.concatenate([self._previous, np.full(i, np.nan)])
+            self._codes.append(code)
+            self._index[code] = i
+        return i
+
+    def update(self, code, price, previous=None):
+        """Новая котировка кода к гривне; previous - курс на прошлом тике"""
+        with self._lock:
+            i = self._slot(code)
+            if previous is None:
+                previous = price if np.isnan(self._current[i]) else self._current[i]
+            self._previous[i] = previous
+            self._current[i] = price
+            self._cached = None
+
+    def rate(self, base, quote):
+        """Сколько единиц quote стоит единица base, None если курса нет"""
+        with self._lock:
+            i = self._index.get(base)
+            j = self._index.get(quote)
+            if i is None or j is None:
+                return None
+            value = self._current[i] / self._current[j]
+        return None if np.isnan(value) else float(value)
+
+    def matrix(self, codes=None):
+        """(codes, матрица кросс-курсов, матрица изменений в долях)"""
+        with self._lock:
+            if codes is None and self._cached is not None:
+                return self._cached
+            selected = self._codes[:] if codes is None else [code for code in codes if code in self._index]
+            idx = np.fromiter((self._index[code] for code in selected), dtype=np.intp, count=len(selected))
+            current = self._current[idx]
+            previous = self._previous[idx]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rates = np.divide.outer(current, current)
+            growth = current / previous
+            changes = np.multiply.outer(growth, 1 / growth) - 1
+
+        result = (selected, rates, changes)
+        if codes is None:
+            with self._lock:
+                if len(self._codes) == len(selected):
+                    self._cached = result
+        return result
+
+    def snapshot(self, codes=None, digits=6):
+        """Кросс-курсы словарём {base: {quote: rate}} без пропусков"""
+        selected, rates, _ = self.matrix(codes)
+        result = {}
+        for i, base in enumerate(selected):
+            row = {quote: round(float(rates[i, j]), digits)
+                   for j, quote in enumerate(selected) if j != i and not np.isnan(rates[i, j])}
+            if row:
+                result[base] = row
+        return result
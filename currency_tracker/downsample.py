@@ -0,0 +1,27 @@
+"""Прореживание длинных рядов до разрешения экрана.
+
+Ряд делится на равные по числу точек корзины, из каждой берутся минимум и
+максимум: пики и провалы сохраняются, а точек остаётся не больше двух на
+корзину. Всё считается векторно в NumPy.
+"""
+import numpy as np
+
+
+def minmax_indices(values, buckets):
+    """Отсортированные индексы точек, которые нужно нарисовать"""
+    count = len(values)
+    if count <= 2 * buckets:
+        return np.arange(count)
+
+    size = -(-count // buckets)
+    rows = -(-count // size)
+    # Хвост последней корзины добиваем NaN, nanargmin/nanargmax их пропускают
+    grid = np.full(rows * size, np.nan)
+    grid[:count] = values
+    grid = grid.reshape(rows, size)
+    offsets = np.arange(rows) * size
+    return np.unique(np.concatenate((
+        [0, count - 1],
+        np.nanargmin(grid, axis=1) + offsets,
+        np.nanargmax(grid, axis=1) + offsets
+    )))
@@ -0,0 +1,68 @@
+"""Параллельная загрузка курсов с ограничением одновременных запросов"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+
+class FetchEngine:
+    """Пул потоков для загрузки курсов.
+
+    max_workers ограничивает общее число параллельных загрузок,
+    per_host_limit - число одновременных запросов к одному хосту.
+    """
+
+    def __init__(self, fetch_func, url_func=None, max_workers=8, per_host_limit=4):
+        self.fetch_func = fetch_func
+        self.url_func = url_func
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+    def host_slot(self, code):
+        """Семафор хоста, с которого загружается курс кода"""
+        host = urlsplit(self.url_func(code)).hostname if self.url_func else ""
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.per_host_limit)
+                self._host_slots[host] = slot
+        return slot
+
+    def _fetch_one(self, code, func=None):
+        with self.host_slot(code):
+            return (func or self.fetch_func)(code)
+
+    def submit(self, code):
+        """Загрузка одного кода в пуле, возвращает Future"""
+        return self._executor.submit(self._fetch_one, code)
+
+    def run(self, code, func):
+        """func(code) в том же пуле и под семафором хоста кода, возвращает Future"""
+        return self._executor.submit(self._fetch_one, code, func)
+
+    def fetch_all(self, codes, on_result=None):
+        """Загрузка всех кодов параллельно.
+
+        on_result(code, price, done, total) вызывается по мере готовности
+        результатов, а не в порядке списка. Возвращает словарь code -> price.
+        """
+        codes = list(dict.fromkeys(codes))
+        total = len(codes)
+        results = {}
+        futures = {self.submit(code): code for code in codes}
+        for done, future in enumerate(as_completed(futures), 1):
+            code = futures[future]
+            try:
+                price = future.result()
+            except Exception as e:
+                print(f"Помилка отримання курсу {code}: {e}")
+                price = None
+            results[code] = price
+            if on_result:
+                on_result(code, price, done, total)
+        return results
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,153 @@
+"""Ограничение частоты запросов и автомат защиты для каждого хоста.
+
+TokenBucket не даёт слать запросы чаще rate в секунду (с запасом burst).
+CircuitBreaker после failure_threshold сбоев подряд размыкается: запросы
+к хосту сразу отклоняются, а через reset_timeout пропускается один
+пробный. Удачная проба замыкает цепь, неудачная размыкает её снова на
+вдвое больший срок.
+"""
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class RateLimitError(RuntimeError):
+    """Жетон не освободился за max_wait секунд"""
+
+
+class CircuitOpenError(RuntimeError):
+    """Хост временно отключён автоматом защиты"""
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(rate, 1)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """Взять жетон, ожидая не дольше timeout секунд; False - не дождались"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None:
+                left = deadline - time.monotonic()
+                if left <= 0 or wait > left:
+                    return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, max_reset_timeout=600):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self._opened_at = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _timeout(self):
+        return min(self.reset_timeout * 2 ** max(self.trips - 1, 0), self.max_reset_timeout)
+
+    def allow(self):
+        """Можно ли слать запрос; в полуоткрытом состоянии - только одну пробу"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self._timeout():
+                    return False
+                self.state = self.HALF_OPEN
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.trips = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self):
+        """Разрешённый запрос так и не был отправлен"""
+        with self._lock:
+            self._probing = False
+
+    def retry_in(self):
+        """Через сколько секунд будет пробный запрос (0 - цепь не разомкнута)"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0
+            return max(self._timeout() - (time.monotonic() - self._opened_at), 0)
+
+
+class HostGuard:
+    """TokenBucket и CircuitBreaker на каждый хост.
+
+    max_wait ограничивает ожидание жетона, чтобы обновление не висело,
+    когда источник деградировал.
+    """
+
+    def __init__(self, rate=5, burst=10, failure_threshold=5, reset_timeout=30, max_wait=5):
+        self.rate = rate
+        self.burst = burst
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_wait = max_wait
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def host(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            entry = self._hosts.get(host)
+            if entry is None:
+                entry = self._hosts[host] = (
+                    TokenBucket(self.rate, self.burst),
+                    CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                )
+            return entry
+
+    def acquire(self, url):
+        """Разрешение на запрос к url или исключение CircuitOpenError / RateLimitError"""
+        bucket, breaker = self.host(url)
+        if not breaker.allow():
+            raise CircuitOpenError(f"{urlsplit(url).netloc}: повтор через {breaker.retry_in():.0f} с")
+        if not bucket.acquire(self.max_wait):
+            # Запрос не ушёл - пробу надо отдать следующему
+            breaker.release()
+            raise RateLimitError(f"{urlsplit(url).netloc}: превышен лимит запросов")
+        return breaker
+
+    def states(self):
+        """Состояние автомата по хостам"""
+        with self._lock:
+            return {host: breaker.state for host, (bucket, breaker) in self._hosts.items()}
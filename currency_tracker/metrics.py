@@ -0,0 +1,166 @@
+"""Метрики трекера: счётчики, значения и гистограммы с метками.
+
+Всё хранится в памяти процесса; снимок выгружается в JSON или в
+текстовый формат Prometheus (например, для textfile-коллектора).
+"""
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+PREFIX = 'currency_tracker_'
+# Границы корзин для времени (сек) и для размеров пачек
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class Histogram:
+    """Число наблюдений по корзинам с верхними границами buckets"""
+
+    def __init__(self, buckets=TIME_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Оценка квантиля линейной интерполяцией внутри корзины, как histogram_quantile"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                low = self.buckets[i - 1] if i else 0.0
+                return low + (self.buckets[i] - low) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def cumulative(self):
+        """Пары (граница, наблюдений не больше неё), последняя граница - +Inf"""
+        total = 0
+        pairs = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+
+def _key(name, labels):
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        f'{key}="' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for key, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+class Metrics:
+    """Потокобезопасный реестр метрик"""
+
+    def __init__(self):
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name, value, buckets=TIME_BUCKETS, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Время выполнения блока в гистограмму name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        """Все метрики как словарь для JSON и окна диагностики"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = [
+                (key, histogram.count, histogram.sum, histogram.quantile(0.5),
+                 histogram.quantile(0.9), histogram.quantile(0.99), histogram.cumulative())
+                for key, histogram in sorted(self._histograms.items())
+            ]
+        return {
+            'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                         for (name, labels), value in counters],
+            'gauges': [{'name': name, 'labels': dict(labels), 'value': value}
+                       for (name, labels), value in gauges],
+            'histograms': [
+                {'name': name, 'labels': dict(labels), 'count': count, 'sum': total,
+                 'p50': p50, 'p90': p90, 'p99': p99,
+                 'buckets': [[_format_bound(bound), cumulative] for bound, cumulative in pairs]}
+                for (name, labels), count, total, p50, p90, p99, pairs in histograms
+            ]
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False)
+
+    def to_prometheus(self):
+        """Текстовый формат Prometheus 0.0.4"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = [(key, histogram.cumulative(), histogram.sum, histogram.count)
+                          for key, histogram in sorted(self._histograms.items())]
+
+        lines = []
+        typed = set()
+
+        def declare(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f'# TYPE {name} {kind}')
+
+        for (name, labels), value in counters:
+            declare(PREFIX + name, 'counter')
+            lines.append(f'{PREFIX}{name}{_format_labels(labels)} {value}')
+        for (name, labels), value in gauges:
+            declare(PREFIX + name, 'gauge')
+            lines.append(f'{PREFIX}{name}{_format_labels(labels)} {value}')
+        for (name, labels), pairs, total, count in histograms:
+            declare(PREFIX + name, 'histogram')
+            for bound, cumulative in pairs:
+                lines.append(f'{PREFIX}{name}_bucket{_format_labels(labels, [("le", _format_bound(bound))])} {cumulative}')
+            lines.append(f'{PREFIX}{name}_sum{_format_labels(labels)} {total}')
+            lines.append(f'{PREFIX}{name}_count{_format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,321 @@
+"""Извлечение курса со страницы Minfin.
+
+Правила проверяются в порядке приоритета, но первым идёт селектор,
+который сработал в прошлый раз для той же раскладки страницы. Потоковый
+разборщик останавливается, как только найден курс по первому правилу.
+"""
+import re
+import threading
+import time
+from html.parser import HTMLParser
+
+try:
+    from selectolax.parser import HTMLParser as LexborTree
+except ImportError:
+    LexborTree = None
+
+try:
+    import lxml  # noqa: F401
+    SOUP_FEATURES = 'lxml'
+except ImportError:
+    SOUP_FEATURES = 'html.parser'
+
+PRICE_RE = re.compile(r'\d+\.\d+')
+STEP_RE = re.compile(
+    r'^(?P<tag>[a-z0-9]+)?(?:\.(?P<cls>[\w-]+))?'
+    r'(?:\[(?P<attr>[\w-]+)(?:\*=(?P<value>[\w-]+))?\])?$'
+)
+
+# Реалістичний діапазон для валют
+MIN_PRICE = 1
+MAX_PRICE = 1000
+
+SELECTORS = (
+    'div[data-currency]',
+    'span.mfm-black-btn',
+    'div.mfm-posr',
+    'div.sc-1x32wa2-9',
+    'table tr td'
+)
+# Запасной вариант: div с "rate" в классе, весь текст которого - число
+FALLBACK_SELECTOR = 'div[class*=rate]'
+
+
+def price_in_text(text):
+    """Первое дробное число в тексте, если оно похоже на курс"""
+    match = PRICE_RE.search(text.replace(',', '.'))
+    if match:
+        price = float(match.group())
+        if MIN_PRICE < price < MAX_PRICE:
+            return price
+    return None
+
+
+def price_of_text(text):
+    """Весь текст как курс"""
+    try:
+        price = float(text.strip().replace(',', '.'))
+    except ValueError:
+        return None
+    return price if MIN_PRICE < price < MAX_PRICE else None
+
+
+RULES = [(selector, price_in_text) for selector in SELECTORS] + [(FALLBACK_SELECTOR, price_of_text)]
+
+
+def compile_selector(selector):
+    """Разбор простого CSS-селектора: tag, tag.class, tag[attr], tag[attr*=value] и потомки через пробел"""
+    steps = []
+    for part in selector.split():
+        match = STEP_RE.match(part)
+        if not match:
+            raise ValueError(f"Неподдерживаемый селектор: {selector}")
+        value = match.group('value')
+        steps.append((match.group('tag'), match.group('cls'), match.group('attr'), value and value.lower()))
+    return tuple(steps)
+
+
+def _step_matches(step, tag, attrs):
+    step_tag, cls, attr, value = step
+    if step_tag and step_tag != tag:
+        return False
+    if cls and cls not in (attrs.get('class') or '').split():
+        return False
+    if attr:
+        if attr not in attrs:
+            return False
+        if value and value not in (attrs[attr] or '').lower():
+            return False
+    return True
+
+
+def _selector_matches(steps, stack, tag, attrs):
+    if not _step_matches(steps[-1], tag, attrs):
+        return False
+    k = len(steps) - 2
+    for ancestor_tag, ancestor_attrs in reversed(stack):
+        if k < 0:
+            break
+        if _step_matches(steps[k], ancestor_tag, ancestor_attrs):
+            k -= 1
+    return k < 0
+
+
+class _StopParsing(Exception):
+    pass
+
+
+class _RuleScanner(HTMLParser):
+    """Однопроходный поиск курса без построения дерева документа"""
+
+    VOID = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                      'link', 'meta', 'param', 'source', 'track', 'wbr'))
+    # Теги, которые неявно закрывают открытый соседний элемент
+    AUTOCLOSE = {
+        'td': ('td', 'th'),
+        'th': ('td', 'th'),
+        'tr': ('tr', 'td', 'th'),
+        'li': ('li',),
+        'p': ('p',),
+        'option': ('option',)
+    }
+    # Текст этих элементов не виден на странице и в курс не попадает
+    HIDDEN = frozenset(('script', 'style'))
+
+    def __init__(self, rules):
+        super().__init__(convert_charrefs=True)
+        self.rules = rules
+        self.by_tag = {}
+        self.any_tag = []
+        for i, (steps, _) in enumerate(rules):
+            tag = steps[-1][0]
+            (self.by_tag.setdefault(tag, []) if tag else self.any_tag).append(i)
+        # Правила без тега проверяются на любом элементе, в том числе рядом с правилами тега
+        for tag, indices in self.by_tag.items():
+            self.by_tag[tag] = sorted(indices + self.any_tag)
+        self.stack = []
+        # [глубина, номер правила, порядковый номер элемента, части текста]
+        self.captures = []
+        self.open_counts = [0] * len(rules)
+        self.candidates = {}
+        self.found = {}
+        self.seq = 0
+        self.hidden_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.VOID:
+            return
+        if tag in self.HIDDEN:
+            self.hidden_depth += 1
+        closes = self.AUTOCLOSE.get(tag)
+        while closes and self.stack and self.stack[-1][0] in closes:
+            self._close_to(len(self.stack) - 1)
+
+        attrs = dict(attrs)
+        depth = len(self.stack)
+        for i in self.by_tag.get(tag, self.any_tag):
+            if i not in self.found and _selector_matches(self.rules[i][0], self.stack, tag, attrs):
+                self.captures.append([depth, i, self.seq, []])
+                self.open_counts[i] += 1
+        self.seq += 1
+        self.stack.append((tag, attrs))
+
+    def handle_data(self, data):
+        if self.hidden_depth:
+            return
+        for capture in self.captures:
+            capture[3].append(data)
+
+    def handle_endtag(self, tag):
+        if tag in self.HIDDEN and self.hidden_depth:
+            self.hidden_depth -= 1
+        for depth in range(len(self.stack) - 1, -1, -1):
+            if self.stack[depth][0] == tag:
+                self._close_to(depth)
+                return
+
+    def _close_to(self, depth):
+        del self.stack[depth:]
+        while self.captures and self.captures[-1][0] >= depth:
+            _, i, seq, parts = self.captures.pop()
+            self.open_counts[i] -= 1
+            if i in self.found:
+                continue
+            price = self.rules[i][1](''.join(parts))
+            if price is not None:
+                self.candidates.setdefault(i, []).append((seq, price))
+            # Пока открыт внешний элемент того же правила, он идёт раньше в документе
+            if self.open_counts[i] == 0 and self.candidates.get(i):
+                self.found[i] = min(self.candidates.pop(i))[1]
+                if i == 0:
+                    raise _StopParsing
+
+    def scan(self, html):
+        try:
+            self.feed(html)
+            self.close()
+            self._close_to(0)
+        except _StopParsing:
+            pass
+        for i in range(len(self.rules)):
+            if i in self.found:
+                return i, self.found[i]
+        return None, None
+
+
+class StreamBackend:
+    """Потоковый разбор на html.parser из стандартной библиотеки"""
+
+    name = 'stream'
+
+    def __init__(self):
+        self._compiled = {}
+
+    def find(self, html, rules):
+        compiled = []
+        for selector, evaluator in rules:
+            steps = self._compiled.get(selector)
+            if steps is None:
+                steps = self._compiled[selector] = compile_selector(selector)
+            compiled.append((steps, evaluator))
+        return _RuleScanner(compiled).scan(html)
+
+
+class SoupBackend:
+    """Полное дерево BeautifulSoup (lxml, если установлен)"""
+
+    name = 'soup'
+
+    def __init__(self, features=None):
+        from bs4 import BeautifulSoup
+        self._soup = BeautifulSoup
+        self.features = features or SOUP_FEATURES
+
+    def find(self, html, rules):
+        soup = self._soup(html, self.features)
+        for i, (selector, evaluator) in enumerate(rules):
+            if selector == FALLBACK_SELECTOR:
+                selector = 'div[class*="rate" i]'
+            for element in soup.select(selector):
+                price = evaluator(element.get_text())
+                if price is not None:
+                    return i, price
+        return None, None
+
+
+class SelectolaxBackend:
+    """Разбор на C-парсере lexbor через selectolax"""
+
+    name = 'selectolax'
+
+    def __init__(self):
+        if LexborTree is None:
+            raise ImportError("selectolax не установлен")
+
+    def find(self, html, rules):
+        tree = LexborTree(html)
+        for i, (selector, evaluator) in enumerate(rules):
+            if selector == FALLBACK_SELECTOR:
+                nodes = (node for node in tree.css('div[class]')
+                         if 'rate' in (node.attributes.get('class') or '').lower())
+            else:
+                nodes = tree.css(selector)
+            for node in nodes:
+                price = evaluator(node.text())
+                if price is not None:
+                    return i, price
+        return None, None
+
+
+BACKENDS = {
+    'stream': StreamBackend,
+    'soup': SoupBackend,
+    'selectolax': SelectolaxBackend
+}
+
+
+def make_backend(name=None):
+    """Бэкенд по имени; без имени - самый быстрый из доступных"""
+    if name is None:
+        name = 'selectolax' if LexborTree is not None else 'stream'
+    return BACKENDS[name]()
+
+
+class PriceExtractor:
+    """Поиск курса с запоминанием удачного селектора для каждой раскладки.
+
+    С metrics (Metrics) время разбора пишется в parse_seconds по селектору.
+    """
+
+    def __init__(self, backend=None, rules=RULES, metrics=None):
+        self.backend = backend or make_backend()
+        self.rules = list(rules)
+        self.metrics = metrics
+        self._preferred = {}
+        self._lock = threading.Lock()
+
+    def ordered_rules(self, layout):
+        with self._lock:
+            selector = self._preferred.get(layout)
+        if selector is None:
+            return self.rules
+        return ([rule for rule in self.rules if rule[0] == selector] +
+                [rule for rule in self.rules if rule[0] != selector])
+
+    def find(self, html, layout=''):
+        """Курс и селектор, по которому он найден: (selector, price)"""
+        rules = self.ordered_rules(layout)
+        started = time.perf_counter()
+        index, price = self.backend.find(html, rules)
+        selector = rules[index][0] if price is not None else None
+        if self.metrics is not None:
+            self.metrics.observe('parse_seconds', time.perf_counter() - started,
+                                 backend=self.backend.name, selector=selector or 'none')
+        if price is None:
+            return None, None
+        with self._lock:
+            self._preferred[layout] = selector
+        return selector, price
+
+    def extract(self, html, layout=''):
+        return self.find(html, layout)[1]
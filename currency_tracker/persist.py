@@ -0,0 +1,169 @@
+"""Сохранение списка валют без блокировки интерфейса.
+
+Файлы пишутся во временный файл рядом с целевым и подменяются через
+os.replace, так что при падении на диске остаётся либо старая, либо
+новая версия целиком. Серии изменений объединяются в одну запись в
+фоновом потоке.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+def atomic_write(path, text):
+    """Атомарная запись текстового файла"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def dump_json(data):
+    """Компактный JSON без отступов"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+class PriceJournal:
+    """Журнал последних курсов: строки "code last current" дописываются в конец.
+
+    При загрузке побеждает последняя строка кода. Когда строк становится
+    намного больше, чем кодов, журнал переписывается атомарно.
+    """
+
+    COMPACT_FACTOR = 4
+    COMPACT_MIN = 1000
+
+    def __init__(self, path='prices.journal'):
+        self.path = path
+        self.prices = {}
+        self._lines = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Последние курсы {code: (last_price, current_price)}"""
+        prices = {}
+        lines = 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    parts = line.split()
+                    # Недописанная при падении строка пропускается
+                    if len(parts) != 3:
+                        continue
+                    try:
+                        prices[parts[0]] = tuple(None if part == '-' else float(part) for part in parts[1:])
+                    except ValueError:
+                        continue
+                    lines += 1
+        except FileNotFoundError:
+            pass
+        self.prices, self._lines = prices, lines
+        return dict(prices)
+
+    def record(self, code, last_price, current_price):
+        """Курс в очередь на запись; повторная запись кода до flush() заменяет прежнюю"""
+        with self._lock:
+            self._pending[code] = (last_price, current_price)
+
+    def _format(self, code, prices):
+        return code + ' ' + ' '.join('-' if price is None else repr(price) for price in prices) + '\n'
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        self.prices.update(pending)
+        if self._lines + len(pending) > self.COMPACT_FACTOR * len(self.prices) + self.COMPACT_MIN:
+            atomic_write(self.path, ''.join(self._format(code, prices) for code, prices in self.prices.items()))
+            self._lines = len(self.prices)
+        else:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(''.join(self._format(code, prices) for code, prices in pending.items()))
+            self._lines += len(pending)
+
+
+class WatchlistSaver:
+    """Отложенное атомарное сохранение списка валют.
+
+    schedule() только запоминает снимок; фоновый поток пишет последний
+    снимок через delay секунд после последнего изменения. Курсы из
+    журнала сбрасываются раз в journal_interval секунд.
+    """
+
+    def __init__(self, save, delay=0.5, journal=None, journal_interval=2.0):
+        self.save = save
+        self.delay = delay
+        self.journal = journal
+        self.journal_interval = journal_interval
+        self.writes = 0
+        self._snapshot = None
+        self._due = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def schedule(self, currencies):
+        """Сохранить список валют; снимок без виджетов делается сразу"""
+        snapshot = [dict(currency) for currency in currencies]
+        with self._lock:
+            self._snapshot = snapshot
+            self._due = time.monotonic() + self.delay
+        self._wakeup.set()
+
+    def record_price(self, code, last_price, current_price):
+        if self.journal is not None:
+            self.journal.record(code, last_price, current_price)
+
+    def _write(self, force=False):
+        with self._lock:
+            # Изменения ещё идут - ждём, пока серия закончится
+            if self._due is None or (not force and time.monotonic() < self._due):
+                snapshot = None
+            else:
+                snapshot, self._snapshot, self._due = self._snapshot, None, None
+        if snapshot is not None:
+            self.save(snapshot)
+            self.writes += 1
+        if self.journal is not None:
+            self.journal.flush()
+
+    def flush(self):
+        """Записать всё отложенное сейчас"""
+        self._write(force=True)
+
+    def _run(self):
+        while not self._closed:
+            with self._lock:
+                due = self._due
+            timeout = self.journal_interval if self.journal is not None else None
+            if due is not None:
+                wait = max(due - time.monotonic(), 0)
+                timeout = wait if timeout is None else min(timeout, wait)
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+            try:
+                self._write()
+            except OSError as e:
+                print(f"Помилка збереження: {e}")
+
+    def close(self):
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self.flush()
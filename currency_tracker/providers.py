@@ -0,0 +1,156 @@
+"""Источники курсов и выбор самого дешёвого исправного из них.
+
+Источник - любой объект с атрибутом name и методом get(code), который
+возвращает курс или None, если источник этот код не знает. Исключение
+из get() считается сбоем источника. Источник с snapshot = True отдаёт
+курсы из одного общего снимка и опрашивается раньше постраничных.
+"""
+import os
+import threading
+import time
+
+from .bulk import BulkRates, parse_csv_rates, parse_json_rates
+from .limits import CircuitOpenError, RateLimitError
+
+
+class PageProvider:
+    """Отдельная HTML-страница на каждую валюту"""
+
+    def __init__(self, http, extractor, url_template, layout, name='page'):
+        self.http = http
+        self.extractor = extractor
+        self.url_template = url_template
+        self.layout = layout
+        self.name = name
+
+    def url(self, code):
+        return self.url_template.format(code=code.lower())
+
+    def get(self, code):
+        return self.http.fetch(self.url(code), lambda html: self.extractor.extract(html, layout=self.layout))
+
+
+class FeedProvider:
+    """Все курсы одним запросом: сводная HTML-страница или JSON/CSV-фид"""
+
+    snapshot = True
+
+    def __init__(self, http, url, parse, ttl=30, name='feed'):
+        self.rates = BulkRates(http, url, parse, ttl=ttl)
+        self.name = name
+
+    def get(self, code):
+        return self.rates.get(code)
+
+
+class FileProvider:
+    """Курсы из локального JSON/CSV-файла, перечитывается при изменении.
+
+    Нужен для работы и проверок без сети.
+    """
+
+    snapshot = True
+
+    def __init__(self, path, parse=None, name=None):
+        self.path = path
+        self.parse = parse or (parse_csv_rates if path.lower().endswith('.csv') else parse_json_rates)
+        self.name = name or f"file:{os.path.basename(path)}"
+        self._rates = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def get(self, code):
+        with self._lock:
+            mtime = os.path.getmtime(self.path)
+            if mtime != self._mtime:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._rates = self.parse(f.read())
+                self._mtime = mtime
+            return self._rates.get(code.lower())
+
+
+class ProviderChain:
+    """Опрос источников по очереди до первого курса.
+
+    Исправные источники-снимки идут первыми: загрузка снимка окупается на
+    всех кодах, и сравнивать её с одной страницей нельзя. Среди остальных
+    считается скользящая средняя задержки (EWMA), и опрошенные источники
+    перебираются от самого быстрого. После max_failures сбоев подряд
+    источник на cooldown секунд уходит в конец очереди.
+    """
+
+    def __init__(self, providers, max_failures=3, cooldown=300, smoothing=0.2):
+        self.providers = list(providers)
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.smoothing = smoothing
+        self._stats = {
+            provider.name: {'latency': None, 'hits': 0, 'misses': 0, 'failures': 0,
+                            'consecutive_failures': 0, 'down_until': 0}
+            for provider in self.providers
+        }
+        self._lock = threading.Lock()
+
+    def ordered(self):
+        """Источники в порядке опроса: исправные снимки, исправные остальные, затем упавшие"""
+        now = time.time()
+        with self._lock:
+            groups = ([], [], [])
+            for provider in self.providers:
+                if self._stats[provider.name]['down_until'] > now:
+                    groups[2].append(provider)
+                else:
+                    groups[0 if getattr(provider, 'snapshot', False) else 1].append(provider)
+
+            ordered = []
+            for group in groups:
+                # Опрошенные занимают свои места в заданном порядке по задержке,
+                # ещё не опрошенные остаются на своих
+                latency = {provider.name: self._stats[provider.name]['latency'] for provider in group}
+                measured = iter(sorted((p for p in group if latency[p.name] is not None),
+                                       key=lambda p: latency[p.name]))
+                ordered.extend(next(measured) if latency[p.name] is not None else p for p in group)
+            return ordered
+
+    def _record(self, provider, started, outcome):
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            stats = self._stats[provider.name]
+            if outcome == 'failure':
+                stats['failures'] += 1
+                stats['consecutive_failures'] += 1
+                if stats['consecutive_failures'] >= self.max_failures:
+                    stats['down_until'] = time.time() + self.cooldown
+                return
+            stats['hits' if outcome == 'hit' else 'misses'] += 1
+            stats['consecutive_failures'] = 0
+            stats['down_until'] = 0
+            if stats['latency'] is None:
+                stats['latency'] = elapsed
+            else:
+                stats['latency'] += self.smoothing * (elapsed - stats['latency'])
+
+    def get(self, code):
+        for provider in self.ordered():
+            started = time.perf_counter()
+            try:
+                price = provider.get(code)
+            except (CircuitOpenError, RateLimitError):
+                # Хост отключён или перегружен - без сообщения на каждый код
+                self._record(provider, started, 'failure')
+                continue
+            except Exception as e:
+                print(f"Помилка отримання курсу {code} ({provider.name}): {e}")
+                self._record(provider, started, 'failure')
+                continue
+            self._record(provider, started, 'hit' if price is not None else 'miss')
+            if price is not None:
+                return price
+        return None
+
+    def stats(self):
+        """Статистика по источникам: задержка (сек), попадания, промахи, сбои"""
+        now = time.time()
+        with self._lock:
+            return {name: dict(stats, healthy=stats['down_until'] <= now)
+                    for name, stats in self._stats.items()}
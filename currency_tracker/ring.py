@@ -0,0 +1,150 @@
+"""Кольцевой буфер тиков на массивах float64.
+
+Каждый тик пишется дважды: в позицию i и i + capacity. Благодаря этому
+последние n тиков всегда лежат в памяти подряд и отдаются срезом-view
+без копирования, а добавление остаётся O(1).
+"""
+import threading
+from array import array
+from bisect import bisect_left
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _zeros(size):
+    if np is not None:
+        return np.zeros(size, dtype=np.float64)
+    return array('d', bytes(8 * size))
+
+
+def _view(buffer, start, stop):
+    if np is not None:
+        return buffer[start:stop]
+    return memoryview(buffer)[start:stop]
+
+
+class RingBuffer:
+    """Тики одной валюты: время (epoch, сек) и курс.
+
+    Память выделяется по мере роста (удвоением) до capacity, после чего
+    старые тики вытесняются и объём больше не меняется.
+    """
+
+    def __init__(self, capacity, initial=64):
+        self.capacity = capacity
+        self._allocated = min(initial, capacity)
+        self._ts = _zeros(2 * self._allocated)
+        self._prices = _zeros(2 * self._allocated)
+        self._head = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self):
+        size = self._size
+        allocated = min(self._allocated * 2, self.capacity)
+        ts = _zeros(2 * allocated)
+        prices = _zeros(2 * allocated)
+        old_ts, old_prices = self.view()
+        for start in (0, allocated):
+            _view(ts, start, start + size)[:] = old_ts
+            _view(prices, start, start + size)[:] = old_prices
+        self._ts, self._prices = ts, prices
+        self._allocated = allocated
+        self._head = size % allocated
+
+    def append(self, ts, price):
+        if self._size == self._allocated and self._allocated < self.capacity:
+            self._grow()
+        i = self._head
+        mirror = i + self._allocated
+        self._ts[i] = self._ts[mirror] = ts
+        self._prices[i] = self._prices[mirror] = price
+        self._head = (i + 1) % self._allocated
+        self._size = min(self._size + 1, self._allocated)
+
+    def extend(self, ticks):
+        for ts, price in ticks:
+            self.append(ts, price)
+
+    def view(self, count=None):
+        """Последние count тиков (все, если None) как пара срезов (ts, prices)"""
+        count = self._size if count is None else min(count, self._size)
+        stop = self._head + self._allocated
+        start = stop - count
+        return _view(self._ts, start, stop), _view(self._prices, start, stop)
+
+    def since(self, start_ts):
+        """Тики с момента start_ts (время должно расти монотонно)"""
+        ts, prices = self.view()
+        if np is not None:
+            offset = int(np.searchsorted(ts, start_ts))
+        else:
+            offset = bisect_left(ts, start_ts)
+        return ts[offset:], prices[offset:]
+
+    def last(self):
+        """Последний тик (ts, price) или None"""
+        if not self._size:
+            return None
+        i = (self._head - 1) % self._allocated
+        return self._ts[i], self._prices[i]
+
+
+class RateHistory:
+    """Кольцевые буферы по кодам валют.
+
+    loader(code) при первом обращении к коду возвращает уже сохранённые
+    тики (например, из HistoryStore), чтобы история переживала перезапуск.
+    """
+
+    def __init__(self, capacity=10000, loader=None):
+        self.capacity = capacity
+        self.loader = loader
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, code):
+        return code in self._buffers
+
+    def buffer(self, code):
+        with self._lock:
+            ring = self._buffers.get(code)
+            if ring is None:
+                ring = RingBuffer(self.capacity)
+                if self.loader:
+                    ring.extend(self.loader(code))
+                self._buffers[code] = ring
+            return ring
+
+    def append(self, code, ts, price):
+        """Добавление тика, возвращает предыдущий тик кода"""
+        ring = self.buffer(code)
+        with self._lock:
+            previous = ring.last()
+            ring.append(ts, price)
+        return previous
+
+    def latest(self, code):
+        """Последний тик кода (ts, price) или None"""
+        ring = self.buffer(code)
+        with self._lock:
+            return ring.last()
+
+    def view(self, code, count=None):
+        ring = self.buffer(code)
+        with self._lock:
+            return ring.view(count)
+
+    def since(self, code, start_ts):
+        ring = self.buffer(code)
+        with self._lock:
+            return ring.since(start_ts)
+
+    def discard(self, code):
+        with self._lock:
+            self._buffers.pop(code, None)
@@ -0,0 +1,135 @@
+"""Планировщик обновлений с интервалом для каждой валюты"""
+import heapq
+import random
+import threading
+import time
+
+
+class RefreshScheduler:
+    """Опрос валют по индивидуальному расписанию.
+
+    Интервал валюты уменьшается вдвое, если курс заметно изменился, и
+    растёт в 1.5 раза, если курс стоит на месте. После ошибки следующая
+    попытка откладывается экспоненциально. Ко всем задержкам добавляется
+    случайный разброс jitter, а новый опрос кода не начинается, пока не
+    закончился предыдущий.
+
+    submit(code) должен вернуть Future с результатом загрузки (CachedRate
+    или None), on_result(code, result) вызывается по готовности. Ошибкой
+    считается None или результат с failed.
+    """
+
+    def __init__(self, submit, on_result, base_interval=300, min_interval=60, max_interval=1800,
+                 max_backoff=1800, jitter=0.1, change_threshold=0.0005):
+        self.submit = submit
+        self.on_result = on_result
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.change_threshold = change_threshold
+        self._states = {}
+        self._heap = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def _jittered(self, delay):
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def _schedule(self, code, state, delay):
+        state['due'] = time.time() + delay
+        heapq.heappush(self._heap, (state['due'], code))
+
+    def set_codes(self, codes):
+        """Новый список валют: новые коды встают в очередь через base_interval"""
+        with self._cond:
+            codes = set(codes)
+            for code in list(self._states):
+                if code not in codes:
+                    del self._states[code]
+            for code in codes:
+                if code not in self._states:
+                    state = {
+                        'interval': self.base_interval,
+                        'failures': 0,
+                        'last_value': None,
+                        'running': False,
+                        'due': None
+                    }
+                    self._states[code] = state
+                    self._schedule(code, state, self._jittered(self.base_interval))
+            self._cond.notify()
+
+    def trigger(self, codes=None):
+        """Опросить коды сейчас (кроме тех, что уже опрашиваются)"""
+        with self._cond:
+            for code in codes if codes is not None else list(self._states):
+                state = self._states.get(code)
+                if state and not state['running']:
+                    self._schedule(code, state, 0)
+            self._cond.notify()
+
+    def snapshot(self):
+        """Текущие интервалы, ошибки и время следующего опроса по кодам"""
+        with self._cond:
+            return {code: (state['interval'], state['failures'], state['due'])
+                    for code, state in self._states.items()}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def _loop(self):
+        with self._cond:
+            while not self._stopped:
+                now = time.time()
+                while self._heap and self._heap[0][0] <= now:
+                    due, code = heapq.heappop(self._heap)
+                    state = self._states.get(code)
+                    # Устаревшие записи очереди (код удалён или перепланирован) пропускаем
+                    if state is None or state['due'] != due or state['running']:
+                        continue
+                    state['running'] = True
+                    future = self.submit(code)
+                    future.add_done_callback(lambda f, code=code: self._done(code, f))
+                timeout = self._heap[0][0] - now if self._heap else None
+                self._cond.wait(timeout)
+
+    def _done(self, code, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Помилка отримання курсу {code}: {e}")
+            result = None
+
+        with self._cond:
+            state = self._states.get(code)
+            if state is not None:
+                state['running'] = False
+                self._schedule(code, state, self._jittered(self._next_delay(state, result)))
+                self._cond.notify()
+
+        self.on_result(code, result)
+
+    def _next_delay(self, state, result):
+        # Устаревший курс из кэша - обычное обновление в фоне, откладываем только после сбоя
+        if result is None or result.failed:
+            state['failures'] += 1
+            return min(self.min_interval * 2 ** state['failures'], self.max_backoff)
+
+        state['failures'] = 0
+        last = state['last_value']
+        if last:
+            if abs(result.value - last) / last > self.change_threshold:
+                state['interval'] = max(self.min_interval, state['interval'] / 2)
+            else:
+                state['interval'] = min(self.max_interval, state['interval'] * 1.5)
+        state['last_value'] = result.value
+        return state['interval']
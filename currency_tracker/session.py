@@ -0,0 +1,141 @@
+"""Общая HTTP-сессия: keep-alive, сжатие и условные запросы"""
+import threading
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+
+class HttpSession:
+    """Потокобезопасная обёртка над requests.Session.
+
+    Соединения переиспользуются через пул адаптера, ответы запрашиваются
+    сжатыми, а повторные запросы отправляются с If-None-Match /
+    If-Modified-Since. На 304 возвращается последний разобранный результат.
+    Сама сессия (и импорт requests) создаётся при первом запросе.
+    С guard (limits.HostGuard) запросы к каждому хосту ограничены по
+    частоте и проходят через автомат защиты.
+    """
+
+    def __init__(self, pool_size=8, timeout=10, guard=None):
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.guard = guard
+        self._session = None
+        self._adapter = None
+        self._lock = threading.Lock()
+        # url -> {'etag', 'last_modified', 'size', 'value'}
+        self._validators = {}
+        self._counters = {
+            'requests': 0,
+            'not_modified': 0,
+            'bytes_wire': 0,
+            'bytes_decoded': 0,
+            'bytes_saved': 0
+        }
+
+    def _open(self):
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                session.headers.update({
+                    'User-Agent': USER_AGENT,
+                    'Accept-Encoding': 'gzip, deflate',
+                    'Connection': 'keep-alive'
+                })
+                self._adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount('https://', self._adapter)
+                session.mount('http://', self._adapter)
+                self._session = session
+            return self._session
+
+    def _conditional_headers(self, url):
+        with self._lock:
+            entry = self._validators.get(url)
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers, entry
+
+    def fetch(self, url, parse):
+        """GET url и разбор ответа функцией parse(text).
+
+        Если сервер ответил 304, parse не вызывается и возвращается
+        значение, разобранное при прошлой загрузке.
+        """
+        breaker = self.guard.acquire(url) if self.guard else None
+        headers, entry = self._conditional_headers(url)
+        try:
+            response = self._open().get(url, headers=headers, timeout=self.timeout)
+        except Exception:
+            if breaker:
+                breaker.record_failure()
+            raise
+        if breaker:
+            # Сбой хоста - только 5xx и 429, на остальное сервер ответил как обычно
+            if response.status_code >= 500 or response.status_code == 429:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+        if response.status_code == 304 and entry:
+            with self._lock:
+                self._counters['requests'] += 1
+                self._counters['not_modified'] += 1
+                self._counters['bytes_saved'] += entry['size']
+            return entry['value']
+
+        response.raise_for_status()
+        body = response.content
+        wire = response.raw.tell() if hasattr(response.raw, 'tell') else len(body)
+        value = parse(response.text)
+
+        with self._lock:
+            self._counters['requests'] += 1
+            self._counters['bytes_wire'] += wire or len(body)
+            self._counters['bytes_decoded'] += len(body)
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if value is not None and (etag or last_modified):
+                self._validators[url] = {
+                    'etag': etag,
+                    'last_modified': last_modified,
+                    'size': len(body),
+                    'value': value
+                }
+            else:
+                self._validators.pop(url, None)
+        return value
+
+    def _connection_counts(self):
+        """Число новых соединений и запросов по всем пулам urllib3"""
+        opened = served = 0
+        if self._adapter is None:
+            return opened, served
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened += getattr(pool, 'num_connections', 0)
+            served += getattr(pool, 'num_requests', 0)
+        return opened, served
+
+    def stats(self):
+        """Счётчики трафика и переиспользованных соединений"""
+        with self._lock:
+            stats = dict(self._counters)
+        opened, served = self._connection_counts()
+        stats['connections_opened'] = opened
+        stats['connections_reused'] = max(served - opened, 0)
+        states = self.guard.states() if self.guard else {}
+        stats['circuits_open'] = sum(1 for state in states.values() if state != 'closed')
+        return stats
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
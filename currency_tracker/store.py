@@ -0,0 +1,214 @@
+"""Хранилище истории курсов в SQLite.
+
+Тики (code, ts, price) пишутся пачками из фонового потока, читаются
+диапазонами по индексу (code, ts) без загрузки всей истории в память.
+"""
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ticks (
+    code TEXT NOT NULL,
+    ts REAL NOT NULL,
+    price REAL NOT NULL,
+    PRIMARY KEY (code, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS alert_rules (
+    id INTEGER PRIMARY KEY,
+    code TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    value REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS alerts (
+    rule_id INTEGER NOT NULL,
+    code TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    value REAL NOT NULL,
+    price REAL NOT NULL,
+    last_price REAL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS alerts_code_ts ON alerts (code, ts);
+"""
+
+
+class HistoryStore:
+    """Журнал тиков курсов.
+
+    append() только кладёт тик в буфер; фоновый поток сбрасывает буфер
+    одной транзакцией раз в flush_interval секунд или при batch_size тиках.
+    """
+
+    def __init__(self, path='history.sqlite3', batch_size=500, flush_interval=1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, code, ts, price):
+        """Добавление тика в очередь на запись"""
+        with self._lock:
+            self._pending.append((code, ts, price))
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def append_many(self, ticks):
+        """Запись пачки тиков (code, ts, price) сразу, дубликаты пропускаются"""
+        conn = self._connection()
+        with conn:
+            cursor = conn.executemany("INSERT OR IGNORE INTO ticks VALUES (?, ?, ?)", ticks)
+        return cursor.rowcount
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if batch:
+            self.append_many(batch)
+
+    def _write_loop(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"Помилка запису історії: {e}")
+
+    def range(self, code, start=None, end=None, bucket=None):
+        """Тики кода за окно [start, end] в порядке времени.
+
+        С bucket (секунды) из каждого интервала берётся последний тик,
+        так что длинная история прореживается на стороне SQLite.
+        """
+        self.flush()
+        query = "SELECT MAX(ts), price FROM ticks" if bucket else "SELECT ts, price FROM ticks"
+        query += " WHERE code = ? AND ts >= ? AND ts <= ?"
+        params = [code, start if start is not None else float('-inf'),
+                  end if end is not None else float('inf')]
+        if bucket:
+            query += " GROUP BY CAST(ts / ? AS INTEGER)"
+            params.append(bucket)
+        query += " ORDER BY 1"
+        return self._connection().execute(query, params)
+
+    def count(self, code, start=None, end=None):
+        """Число тиков кода в окне"""
+        self.flush()
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM ticks WHERE code = ? AND ts >= ? AND ts <= ?",
+            (code, start if start is not None else float('-inf'), end if end is not None else float('inf'))
+        ).fetchone()[0]
+
+    def tail(self, code, count):
+        """Последние count тиков кода в порядке времени"""
+        self.flush()
+        rows = self._connection().execute(
+            "SELECT ts, price FROM ticks WHERE code = ? ORDER BY ts DESC LIMIT ?",
+            (code, count)
+        ).fetchall()
+        rows.reverse()
+        return rows
+
+    def latest(self, code, before=None):
+        """Последний тик кода (ts, price), при before - строго раньше этого времени"""
+        limit = before if before is not None else float('inf')
+        with self._lock:
+            pending = [(ts, price) for c, ts, price in self._pending if c == code and ts < limit]
+        if pending:
+            return max(pending)
+        return self._connection().execute(
+            "SELECT ts, price FROM ticks WHERE code = ? AND ts < ? ORDER BY ts DESC LIMIT 1",
+            (code, limit)
+        ).fetchone()
+
+    def codes(self):
+        self.flush()
+        return [row[0] for row in self._connection().execute("SELECT DISTINCT code FROM ticks")]
+
+    def apply_retention(self, max_age=None, downsample_after=None, bucket=3600, now=None):
+        """Политика хранения.
+
+        Тики старше max_age удаляются, тики старше downsample_after
+        прореживаются до одного (последнего) на интервал bucket.
+        Возвращает число удалённых строк.
+        """
+        self.flush()
+        now = now if now is not None else time.time()
+        conn = self._connection()
+        removed = 0
+        with conn:
+            if max_age is not None:
+                removed += conn.execute("DELETE FROM ticks WHERE ts < ?", (now - max_age,)).rowcount
+            if downsample_after is not None:
+                cutoff = now - downsample_after
+                removed += conn.execute(
+                    """DELETE FROM ticks WHERE ts < :cutoff AND (code, ts) NOT IN (
+                           SELECT code, MAX(ts) FROM ticks WHERE ts < :cutoff
+                           GROUP BY code, CAST(ts / :bucket AS INTEGER))""",
+                    {'cutoff': cutoff, 'bucket': bucket}
+                ).rowcount
+        return removed
+
+    def alert_rules(self):
+        """Правила оповещений (id, code, kind, value)"""
+        return self._connection().execute("SELECT id, code, kind, value FROM alert_rules ORDER BY id").fetchall()
+
+    def add_alert_rule(self, code, kind, value):
+        conn = self._connection()
+        with conn:
+            return conn.execute(
+                "INSERT INTO alert_rules (code, kind, value) VALUES (?, ?, ?)", (code, kind, value)
+            ).lastrowid
+
+    def remove_alert_rule(self, rule_id):
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM alert_rules WHERE id = ?", (rule_id,))
+
+    def record_alert(self, alert):
+        """Запись сработавшего оповещения (alerts.Alert)"""
+        rule = alert.rule
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO alerts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (rule.id, rule.code, rule.kind, rule.value, alert.price, alert.last_price, alert.ts)
+            )
+
+    def alerts(self, code=None, limit=100):
+        """Последние сработавшие оповещения, новые первыми"""
+        query = "SELECT rule_id, code, kind, value, price, last_price, ts FROM alerts"
+        params = []
+        if code is not None:
+            query += " WHERE code = ?"
+            params.append(code)
+        query += " ORDER BY ts DESC LIMIT ?"
+        params.append(limit)
+        return self._connection().execute(query, params).fetchall()
+
+    def close(self):
+        self._closed = True
+        self._wakeup.set()
+        self._writer.join(timeout=5)
+        self.flush()
@@ -1,21 +1,517 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, Toplevel
-import requests
-from bs4 import BeautifulSoup
+from tkinter import ttk, messagebox, filedialog, Toplevel
 import threading
 import time
-from datetime import datetime
-import json
-import os
+from datetime import datetime, timezone
 import ttkbootstrap as tb
 from ttkbootstrap.constants import *
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.dates as mdates
-from collections import deque
-import webbrowser
+import numpy as np
+
+from currency_tracker.alerts import KINDS, describe
+from currency_tracker.analytics import RollingStats
+from currency_tracker.bus import UpdateBus
+from currency_tracker.core import TrackerCore, load_watchlist, save_watchlist
+from currency_tracker.metrics import SIZE_BUCKETS
+from currency_tracker.persist import PriceJournal, WatchlistSaver, atomic_write
+from currency_tracker.downsample import minmax_indices
+
+class CurrencyCards:
+    """Карточки валют, привязанные к коду валюты.
+    
+    sync() сравнивает список валют с уже созданными карточками и
+    создаёт или удаляет только изменившиеся, остальные не перестраиваются.
+    """
+    
+    def __init__(self, app, parent):
+        self.app = app
+        self.parent = parent
+        self.widgets = {}
+        self.empty_label = None
+    
+    def sync(self, currencies):
+        """Приведение карточек к списку валют"""
+        wanted = {currency['code'] for currency in currencies}
+        for code in [code for code in self.widgets if code not in wanted]:
+            self.widgets.pop(code)['card'].destroy()
+        
+        if not currencies:
+            self.show_empty()
+            return
+        if self.empty_label is not None:
+            self.empty_label.destroy()
+            self.empty_label = None
+        
+        # Новые карточки встают на своё место в списке
+        previous = None
+        for currency in currencies:
+            widgets = self.widgets.get(currency['code'])
+            if widgets is None:
+                widgets = self.create_card(currency, previous)
+                self.widgets[currency['code']] = widgets
+            previous = widgets['card']
+    
+    def show_empty(self):
+        if self.empty_label is not None:
+            return
+        self.empty_label = tb.Label(
+            self.parent,
+            text="📊 Нет добавленных валют\nДобавьте валюту выше для отслеживания",
+            bootstyle="secondary",
+            font=("Helvetica", 14),
+            justify="center"
+        )
+        self.empty_label.pack(pady=50)
+    
+    def create_card(self, currency, previous=None):
+        """Создание карточки валюты"""
+        widgets = self.build_card()
+        card = widgets['card']
+        if previous is not None:
+            card.pack(fill=X, pady=5, padx=5, after=previous)
+        else:
+            slaves = self.parent.pack_slaves()
+            position = {'before': slaves[0]} if slaves else {}
+            card.pack(fill=X, pady=5, padx=5, **position)
+        
+        self.bind_card(widgets, currency)
+        return widgets
+    
+    def build_card(self):
+        """Виджеты карточки без привязки к валюте"""
+        widgets = {}
+        
+        # Карточка
+        card = tb.Frame(self.parent, padding=15, bootstyle="card")
+        
+        # Верхняя часть - название и флаги
+        header_frame = tb.Frame(card)
+        header_frame.pack(fill=X, pady=(0, 10))
+        
+        # Название валюты
+        name_label = tb.Label(
+            header_frame,
+            font=("Helvetica", 14, "bold"),
+            bootstyle="primary"
+        )
+        name_label.pack(side=LEFT)
+        
+        # Кнопки действий
+        actions_frame = tb.Frame(header_frame)
+        actions_frame.pack(side=RIGHT)
+        
+        # График
+        chart_btn = tb.Button(
+            actions_frame,
+            text="📈",
+            command=lambda: self.app.show_chart(widgets['code']),
+            bootstyle="outline-info",
+            width=3
+        )
+        chart_btn.pack(side=LEFT, padx=2)
+        
+        # Оповещения
+        alert_btn = tb.Button(
+            actions_frame,
+            text="🔔",
+            command=lambda: self.app.show_alerts(widgets['code']),
+            bootstyle="outline-warning",
+            width=3
+        )
+        alert_btn.pack(side=LEFT, padx=2)
+        
+        # Удалить
+        remove_btn = tb.Button(
+            actions_frame,
+            text="🗑️",
+            command=lambda: self.app.remove_currency(widgets['code']),
+            bootstyle="outline-danger",
+            width=3
+        )
+        remove_btn.pack(side=LEFT, padx=2)
+        
+        # Основная информация
+        info_frame = tb.Frame(card)
+        info_frame.pack(fill=X)
+        
+        # Текущий курс
+        price_frame = tb.Frame(info_frame)
+        price_frame.pack(side=LEFT, padx=(0, 20))
+        
+        tb.Label(price_frame, text="Курс:", bootstyle="secondary").pack(anchor="w")
+        price_label = tb.Label(
+            price_frame,
+            font=("Helvetica", 16, "bold")
+        )
+        price_label.pack(anchor="w")
+        
+        # Изменение
+        change_frame = tb.Frame(info_frame)
+        change_frame.pack(side=LEFT, padx=(0, 20))
+        
+        tb.Label(change_frame, text="Изменение:", bootstyle="secondary").pack(anchor="w")
+        
+        change_label = tb.Label(
+            change_frame,
+            font=("Helvetica", 12)
+        )
+        change_label.pack(anchor="w")
+        
+        # Время последнего обновления
+        time_frame = tb.Frame(info_frame)
+        time_frame.pack(side=RIGHT)
+        
+        tb.Label(time_frame, text="Обновлено:", bootstyle="secondary").pack(anchor="w")
+        time_label = tb.Label(
+            time_frame,
+            font=("Helvetica", 10),
+            bootstyle="info"
+        )
+        time_label.pack(anchor="w")
+        
+        # Скользящая статистика
+        stats_label = tb.Label(
+            card,
+            font=("Helvetica", 9),
+            bootstyle="secondary"
+        )
+        stats_label.pack(anchor="w", pady=(8, 0))
+        
+        # Сохраняем виджеты
+        widgets.update({
+            'code': None,
+            'card': card,
+            'name_label': name_label,
+            'price_label': price_label,
+            'change_label': change_label,
+            'time_label': time_label,
+            'stats_label': stats_label
+        })
+        return widgets
+    
+    def bind_card(self, widgets, currency):
+        """Привязка карточки к валюте"""
+        widgets['code'] = currency['code']
+        widgets['name_label'].config(text=f"{currency['name']} ({currency['code'].upper()})")
+        self.refresh(currency, widgets, placeholder="Загрузка...")
+    
+    def refresh(self, currency, widgets=None, placeholder="Ошибка"):
+        """Обновление карточки валюты"""
+        widgets = widgets or self.widgets.get(currency['code'])
+        if widgets is None:
+            return
+        
+        if currency.get('current_price'):
+            # Источник недоступен - последний известный курс другим цветом
+            style = "warning" if currency.get('stale') else "success"
+            widgets['price_label'].config(text=f"{currency['current_price']:.2f} ₴", bootstyle=style)
+        else:
+            widgets['price_label'].config(text=placeholder, bootstyle="secondary")
+        
+        if currency.get('last_price') and currency.get('current_price'):
+            change = currency['current_price'] - currency['last_price']
+            change_percent = (change / currency['last_price']) * 100
+            
+            if change > 0:
+                change_text = f"▲ +{change:.2f} (+{change_percent:.2f}%)"
+                change_color = "success"
+            elif change < 0:
+                change_text = f"▼ {change:.2f} ({change_percent:.2f}%)"
+                change_color = "danger"
+            else:
+                change_text = "→ 0.00 (0.00%)"
+                change_color = "secondary"
+        else:
+            change_text = "Нет данных"
+            change_color = "secondary"
+        widgets['change_label'].config(text=change_text, bootstyle=change_color)
+        widgets['stats_label'].config(text=self.stats_text(currency.get('stats')))
+        
+        # Обновляем время
+        now = datetime.now().strftime("%H:%M:%S")
+        widgets['time_label'].config(text=f"⚠ курс устарел, {now}" if currency.get('stale') else now)
+    
+    def stats_text(self, stats):
+        if not stats or stats['count'] < 2:
+            return "Статистика: мало данных"
+        return (
+            f"SMA({stats['count']}) {stats['sma']:.2f} · EMA {stats['ema']:.2f} · "
+            f"σ {stats['std']:.3f} · мин {stats['min']:.2f} · макс {stats['max']:.2f}"
+        )
+    
+    def destroy(self):
+        for widgets in self.widgets.values():
+            widgets['card'].destroy()
+        self.widgets = {}
+        if self.empty_label is not None:
+            self.empty_label.destroy()
+            self.empty_label = None
+
+class VirtualCurrencyCards(CurrencyCards):
+    """Виртуальный список карточек для больших списков валют.
+    
+    Карточек создаётся ровно столько, сколько помещается в видимой части
+    canvas. При прокрутке они переиспользуются для других валют, а область
+    прокрутки считается из числа строк, поэтому число виджетов не зависит
+    от длины списка.
+    """
+    
+    ROW_HEIGHT = 175
+    
+    def __init__(self, app, canvas, scrollbar):
+        super().__init__(app, canvas)
+        self.canvas = canvas
+        self.scrollbar = scrollbar
+        self.currencies = []
+        # Пул карточек: (виджеты, id окна на canvas)
+        self.pool = []
+        self.empty_item = None
+        self.region = None
+        self.canvas.configure(yscrollcommand=self.on_scroll)
+        self.canvas.bind("<Configure>", lambda e: self.layout())
+    
+    def sync(self, currencies):
+        """Новый список валют: меняется только область прокрутки и видимые строки"""
+        self.currencies = list(currencies)
+        if not self.currencies:
+            self.show_empty()
+        elif self.empty_item is not None:
+            self.canvas.delete(self.empty_item)
+            self.empty_label.destroy()
+            self.empty_item = self.empty_label = None
+        self.layout()
+    
+    def show_empty(self):
+        if self.empty_label is not None:
+            return
+        self.empty_label = tb.Label(
+            self.canvas,
+            text="📊 Нет добавленных валют\nДобавьте валюту выше для отслеживания",
+            bootstyle="secondary",
+            font=("Helvetica", 14),
+            justify="center"
+        )
+        self.empty_item = self.canvas.create_window((20, 50), window=self.empty_label, anchor="nw")
+    
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.layout()
+    
+    def layout(self):
+        """Привязка карточек пула к строкам, попадающим в окно"""
+        width = max(self.canvas.winfo_width(), 1)
+        height = max(self.canvas.winfo_height(), 1)
+        rows = len(self.currencies)
+        region = (0, 0, width, rows * self.ROW_HEIGHT)
+        # Перенастройка области прокрутки снова вызывает on_scroll
+        if region != self.region:
+            self.region = region
+            self.canvas.configure(scrollregion=region)
+        
+        top = max(self.canvas.canvasy(0), 0)
+        first = int(top // self.ROW_HEIGHT)
+        last = min(int((top + height) // self.ROW_HEIGHT) + 1, rows)
+        
+        # Пул растёт только до размера окна
+        while len(self.pool) < last - first:
+            widgets = self.build_card()
+            item = self.canvas.create_window((5, 0), window=widgets['card'], anchor="nw")
+            self.pool.append((widgets, item))
+        
+        visible = {}
+        used = set()
+        for row in range(first, last):
+            slot = row % len(self.pool)
+            widgets, item = self.pool[slot]
+            currency = self.currencies[row]
+            if widgets['code'] != currency['code']:
+                self.bind_card(widgets, currency)
+            self.canvas.coords(item, 5, row * self.ROW_HEIGHT + 5)
+            self.canvas.itemconfigure(item, width=width - 10, height=self.ROW_HEIGHT - 10, state="normal")
+            visible[currency['code']] = widgets
+            used.add(slot)
+        
+        for slot, (widgets, item) in enumerate(self.pool):
+            if slot not in used:
+                widgets['code'] = None
+                self.canvas.itemconfigure(item, state="hidden")
+        
+        # Обновления цен доходят только до видимых карточек
+        self.widgets = visible
+    
+    def destroy(self):
+        for widgets, item in self.pool:
+            self.canvas.delete(item)
+            widgets['card'].destroy()
+        self.pool = []
+        self.widgets = {}
+        if self.empty_item is not None:
+            self.canvas.delete(self.empty_item)
+            self.empty_label.destroy()
+            self.empty_item = self.empty_label = None
+        self.canvas.unbind("<Configure>")
+        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+
+class ChartWindow:
+    """Окно графика одной валюты с дорисовкой новых тиков.
+    
+    Figure создаётся один раз на окно и без pyplot, поэтому закрытое окно
+    не остаётся в глобальном реестре фигур. Линии анимированные: пока
+    новая точка помещается в оси, перерисовываются только они (блиттинг
+    поверх сохранённого фона), иначе оси расширяются с запасом и график
+    рисуется целиком. Длинный ряд прореживается до ширины окна в пикселях.
+    """
+    
+    def __init__(self, app, code, times, prices):
+        # matplotlib грузится при первом открытии графика, а не при запуске
+        import matplotlib.dates as mdates
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+        
+        # Время из буфера - секунды эпохи, matplotlib считает даты в днях
+        self.epoch = mdates.date2num(datetime.fromtimestamp(0, timezone.utc))
+        self.app = app
+        self.code = code
+        self.size = 0
+        # Строки: даты, курс, SMA, EMA
+        self.data = np.empty((4, max(2 * len(prices), 256)))
+        self.stats = RollingStats(app.core.ANALYTICS_WINDOW, app.core.ANALYTICS_EMA_SPAN)
+        self.background = None
+        
+        self.window = Toplevel(app.root)
+        self.window.title(f"График {code.upper()}")
+        self.window.geometry("800x600")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        
+        # Фрейм для графика
+        chart_frame = tb.Frame(self.window, padding=20)
+        chart_frame.pack(fill=BOTH, expand=YES)
+        
+        self.figure = Figure(figsize=(8, 6))
+        ax = self.ax = self.figure.add_subplot()
+        ax.set_title(f'Изменение курса {code.upper()}', fontsize=16, fontweight='bold')
+        ax.set_xlabel('Время', fontsize=12)
+        ax.set_ylabel('Курс (₴)', fontsize=12)
+        ax.grid(True, alpha=0.3)
+        
+        # Форматирование оси X
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M', tz=datetime.now().astimezone().tzinfo))
+        ax.tick_params(axis='x', labelrotation=45)
+        
+        # Курс и скользящие средние с тем же окном, что и на карточке
+        self.price_line, = ax.plot([], [], marker='o', linestyle='-', color='#2196F3', linewidth=2, markersize=4, label='Курс', animated=True)
+        self.sma_line, = ax.plot([], [], linestyle='--', color='#FF9800', linewidth=1.5, label=f'SMA({app.core.ANALYTICS_WINDOW})', animated=True)
+        self.ema_line, = ax.plot([], [], linestyle='-', color='#9C27B0', linewidth=1.5, alpha=0.8, label=f'EMA({app.core.ANALYTICS_EMA_SPAN})', animated=True)
+        ax.legend(loc='upper left')
+        self.stats_text = ax.text(
+            0.99, 0.02, "",
+            transform=ax.transAxes, ha='right', va='bottom', fontsize=10,
+            bbox={'boxstyle': 'round', 'facecolor': 'white', 'alpha': 0.8},
+            animated=True
+        )
+        self.artists = (self.price_line, self.sma_line, self.ema_line, self.stats_text)
+        
+        # Добавляем график в окно
+        self.canvas = FigureCanvasTkAgg(self.figure, master=chart_frame)
+        self.canvas.get_tk_widget().pack(fill=BOTH, expand=YES)
+        # Фон для блиттинга снимается после каждой полной отрисовки (в том числе при resize)
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+        
+        # История заполняется разом, по точкам досчитываются только SMA и EMA
+        count = self.size = len(prices)
+        self.data[0, :count] = np.asarray(times) / 86400.0 + self.epoch
+        self.data[1, :count] = prices
+        for i in range(count):
+            snapshot = self.stats.update(float(self.data[1, i]))
+            self.data[2, i], self.data[3, i] = snapshot['sma'], snapshot['ema']
+        self.redraw(full=True)
+    
+    def push(self, ts, price):
+        if self.size == self.data.shape[1]:
+            grown = np.empty((4, self.size * 2))
+            grown[:, :self.size] = self.data
+            self.data = grown
+        snapshot = self.stats.update(float(price))
+        self.data[:, self.size] = (ts / 86400.0 + self.epoch, price, snapshot['sma'], snapshot['ema'])
+        self.size += 1
+    
+    def append(self, ts, price):
+        """Новый тик из apply_tick"""
+        if self.size and ts / 86400.0 + self.epoch <= self.data[0, self.size - 1]:
+            return
+        self.push(ts, price)
+        self.redraw()
+    
+    def fits(self):
+        """Помещается ли последняя точка в текущие оси"""
+        date, price = self.data[0, self.size - 1], self.data[1, self.size - 1]
+        (x0, x1), (y0, y1) = self.ax.get_xlim(), self.ax.get_ylim()
+        return x0 <= date <= x1 and y0 <= price <= y1
+    
+    def rescale(self):
+        dates, prices = self.data[0, :self.size], self.data[1, :self.size]
+        span = max(dates[-1] - dates[0], 1 / 1440)
+        low, high = prices.min(), prices.max()
+        pad = max((high - low) * 0.1, abs(high) * 0.001, 1e-6)
+        # Запас справа и по краям, чтобы следующие тики шли блиттингом
+        self.ax.set_xlim(dates[0] - span * 0.02, dates[-1] + span * 0.1)
+        self.ax.set_ylim(low - pad, high + pad)
+    
+    def update_artists(self):
+        width = self.canvas.get_tk_widget().winfo_width()
+        buckets = max(width, 800) // 2
+        data = self.data[:, :self.size]
+        points = data[:, minmax_indices(data[1], buckets)]
+        self.price_line.set_data(points[0], points[1])
+        self.price_line.set_marker('o' if points.shape[1] <= 200 else '')
+        self.sma_line.set_data(points[0], points[2])
+        self.ema_line.set_data(points[0], points[3])
+        
+        stats = self.stats.snapshot()
+        self.stats_text.set_text(
+            f"σ {stats['std']:.3f}\nмин {stats['min']:.2f}\nмакс {stats['max']:.2f}" if stats['count'] > 1 else ""
+        )
+    
+    def draw_artists(self):
+        for artist in self.artists:
+            self.ax.draw_artist(artist)
+    
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.draw_artists()
+    
+    def redraw(self, full=False):
+        self.update_artists()
+        if full or self.background is None or not self.fits():
+            self.rescale()
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_artists()
+        self.canvas.blit(self.figure.bbox)
+    
+    def close(self):
+        self.app.chart_windows.pop(self.code, None)
+        self.background = None
+        self.figure.clear()
+        self.canvas.get_tk_widget().destroy()
+        self.window.destroy()
 
 class CurrencyTracker:
+    # Окно графика (сек)
+    CHART_WINDOW = 7 * 24 * 3600
+    # С какого числа валют карточки рисуются виртуальным списком
+    VIRTUAL_LIST_THRESHOLD = 100
+    # Интерфейс забирает обновления раз в UI_FRAME_MS и тратит на них до UI_FRAME_BUDGET сек
+    UI_FRAME_MS = 50
+    UI_FRAME_BUDGET = 0.008
+    # Последние курсы валют из списка
+    PRICE_JOURNAL_PATH = 'prices.journal'
+    # Через сколько мс после запуска идёт первая загрузка курсов
+    STARTUP_REFRESH_MS = 100
+    # Проба задержки цикла Tk и обновление окна диагностики (мс)
+    LAG_PROBE_MS = 250
+    DIAGNOSTICS_REFRESH_MS = 1000
+
     def __init__(self, root):
         self.root = root
         self.root.title("💰 Currency Tracker Pro")
@@ -28,19 +524,33 @@ class CurrencyTracker:
         
         # Данные о валютах
         self.currencies = []
-        self.currency_widgets = {}
-        self.price_history = {}  # История цен для графиков
+        self.currency_index = {}
         self.load_currencies()
         
+        # Обновления из фоновых потоков для интерфейса
+        self.update_bus = UpdateBus()
+        
+        # Загрузка, история и автообновление курсов
+        self.core = TrackerCore()
+        self.core.add_listener(self.on_tick)
+        self.core.alerts.listeners.append(self.on_alert)
+        self.price_history = self.core.price_history
+        # Открытые окна графиков по кодам валют
+        self.chart_windows = {}
+        
         # Настройка стилей
         self.setup_styles()
         
         # Интерфейс
         self.setup_ui()
         
-        # Запуск обновления
-        self.update_currencies()
-        self.start_auto_update()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Запуск обновления: карточки уже показаны с сохранёнными курсами,
+        # сеть трогаем только после первой отрисовки окна
+        self.drain_updates()
+        self.probe_loop_lag()
+        self.root.after(self.STARTUP_REFRESH_MS, self.start_updates)
         
     def apply_theme(self):
         self.style.theme_use(self.current_theme)
@@ -59,44 +569,17 @@ class CurrencyTracker:
     
     def load_currencies(self):
         """Завантаження збережених валют"""
-        try:
-            if os.path.exists('currencies.json'):
-                with open('currencies.json', 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.currencies = data.get('currencies', [])
-                    # Валидация данных
-                    for currency in self.currencies:
-                        if not all(key in currency for key in ['code', 'name']):
-                            self.currencies = []
-                            break
-        except (json.JSONDecodeError, KeyError, TypeError) as e:
-            print(f"Помилка завантаження JSON: {e}. Використовуються стандартні налаштування.")
-            self.currencies = []
-        
-        # Если нет валют, добавляем дефолтные
-        if not self.currencies:
-            self.currencies = [
-                {'code': 'usd', 'name': 'Долар США', 'last_price': None, 'current_price': None}
-            ]
+        # Курсы ведёт журнал, в currencies.json - только список валют
+        journal = PriceJournal(self.PRICE_JOURNAL_PATH)
+        self.currencies = load_watchlist(journal=journal, quarantine=True)
+        self.watchlist_saver = WatchlistSaver(
+            lambda currencies: save_watchlist(currencies, with_prices=False),
+            journal=journal
+        )
     
     def save_currencies(self):
-        """Збереження списку валют"""
-        data = {'currencies': []}
-        for currency in self.currencies:
-            # Копіюємо тільки дані, без віджетів
-            currency_data = {
-                'code': currency['code'],
-                'name': currency['name'],
-                'last_price': currency.get('last_price'),
-                'current_price': currency.get('current_price')
-            }
-            data['currencies'].append(currency_data)
-        
-        try:
-            with open('currencies.json', 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"Помилка збереження: {e}")
+        """Збереження списку валют (у фоні, серія змін - один запис)"""
+        self.watchlist_saver.schedule(self.currencies)
     
     def setup_ui(self):
         # Главный контейнер
@@ -164,24 +647,38 @@ class CurrencyTracker:
         self.currency_container.pack(fill=BOTH, expand=YES)
         
         # Скроллбар
-        scrollbar = ttk.Scrollbar(self.currency_container)
-        scrollbar.pack(side=RIGHT, fill=Y)
+        self.scrollbar = ttk.Scrollbar(self.currency_container)
+        self.scrollbar.pack(side=RIGHT, fill=Y)
         
         # Canvas для скроллинга
-        self.canvas = tk.Canvas(self.currency_container, yscrollcommand=scrollbar.set, bg=self.style.lookup("TFrame", "background"))
+        self.canvas = tk.Canvas(self.currency_container, yscrollcommand=self.scrollbar.set, bg=self.style.lookup("TFrame", "background"))
         self.canvas.pack(side=LEFT, fill=BOTH, expand=YES)
-        scrollbar.config(command=self.canvas.yview)
+        self.scrollbar.config(command=self.canvas.yview)
         
         # Фрейм внутри canvas
         self.currency_frame = tb.Frame(self.canvas)
-        self.canvas.create_window((0, 0), window=self.currency_frame, anchor="nw")
+        self.frame_window = self.canvas.create_window((0, 0), window=self.currency_frame, anchor="nw")
         
         # Обновление скроллинга
-        self.currency_frame.bind("<Configure>", lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
+        self.currency_frame.bind("<Configure>", self.on_frame_configure)
         
-        # Обновляем список валют
+        # Карточки валют по коду
+        self.cards = None
         self.update_currency_list()
     
+    def on_frame_configure(self, event=None):
+        if not isinstance(self.cards, VirtualCurrencyCards):
+            self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+    
+    def make_cards(self, virtual):
+        """Обычный или виртуальный список карточек"""
+        self.canvas.yview_moveto(0)
+        if virtual:
+            self.canvas.itemconfigure(self.frame_window, state="hidden")
+            return VirtualCurrencyCards(self, self.canvas, self.scrollbar)
+        self.canvas.itemconfigure(self.frame_window, state="normal")
+        return CurrencyCards(self, self.currency_frame)
+    
     def setup_top_bar(self):
         top_frame = tb.Frame(self.main_container)
         top_frame.pack(fill=X, pady=(0, 20))
@@ -221,6 +718,24 @@ class CurrencyTracker:
             bootstyle="success-outline"
         )
         refresh_btn.pack(side=LEFT)
+        
+        # Кросс-курсы
+        cross_btn = tb.Button(
+            control_frame,
+            text="⇄ Кросс-курсы",
+            command=self.show_cross_rates,
+            bootstyle="info-outline"
+        )
+        cross_btn.pack(side=LEFT, padx=(10, 0))
+        
+        # Диагностика
+        diagnostics_btn = tb.Button(
+            control_frame,
+            text="📊 Диагностика",
+            command=self.show_diagnostics,
+            bootstyle="secondary-outline"
+        )
+        diagnostics_btn.pack(side=LEFT, padx=(10, 0))
     
     def setup_status_bar(self):
         self.status_frame = tb.Frame(self.main_container)
@@ -257,305 +772,293 @@ class CurrencyTracker:
     
     def update_currency_list(self):
         """Обновление списка валют на экране"""
-        for widget in self.currency_frame.winfo_children():
-            widget.destroy()
-        
-        if not self.currencies:
-            empty_label = tb.Label(
-                self.currency_frame,
-                text="📊 Нет добавленных валют\nДобавьте валюту выше для отслеживания",
-                bootstyle="secondary",
-                font=("Helvetica", 14),
-                justify="center"
-            )
-            empty_label.pack(pady=50)
-            return
-        
-        # Отображение каждой валюты
-        for i, currency in enumerate(self.currencies):
-            self.create_currency_card(currency, i)
-    
-    def create_currency_card(self, currency, index):
-        """Создание карточки валюты"""
-        # Карточка
-        card = tb.Frame(self.currency_frame, padding=15, bootstyle="card")
-        card.pack(fill=X, pady=5, padx=5)
-        
-        # Верхняя часть - название и флаги
-        header_frame = tb.Frame(card)
-        header_frame.pack(fill=X, pady=(0, 10))
-        
-        # Название валюты
-        name_label = tb.Label(
-            header_frame,
-            text=f"{currency['name']} ({currency['code'].upper()})",
-            font=("Helvetica", 14, "bold"),
-            bootstyle="primary"
-        )
-        name_label.pack(side=LEFT)
-        
-        # Кнопки действий
-        actions_frame = tb.Frame(header_frame)
-        actions_frame.pack(side=RIGHT)
-        
-        # График
-        chart_btn = tb.Button(
-            actions_frame,
-            text="📈",
-            command=lambda: self.show_chart(currency['code']),
-            bootstyle="outline-info",
-            width=3
-        )
-        chart_btn.pack(side=LEFT, padx=2)
-        
-        # Удалить
-        remove_btn = tb.Button(
-            actions_frame,
-            text="🗑️",
-            command=lambda idx=index: self.remove_currency(idx),
-            bootstyle="outline-danger",
-            width=3
-        )
-        remove_btn.pack(side=LEFT, padx=2)
-        
-        # Основная информация
-        info_frame = tb.Frame(card)
-        info_frame.pack(fill=X)
-        
-        # Текущий курс
-        price_frame = tb.Frame(info_frame)
-        price_frame.pack(side=LEFT, padx=(0, 20))
-        
-        tb.Label(price_frame, text="Курс:", bootstyle="secondary").pack(anchor="w")
-        price_text = f"{currency['current_price']:.2f} ₴" if currency['current_price'] else "Загрузка..."
-        price_label = tb.Label(
-            price_frame,
-            text=price_text,
-            font=("Helvetica", 16, "bold"),
-            bootstyle="success" if currency['current_price'] else "secondary"
-        )
-        price_label.pack(anchor="w")
-        
-        # Изменение
-        change_frame = tb.Frame(info_frame)
-        change_frame.pack(side=LEFT, padx=(0, 20))
-        
-        tb.Label(change_frame, text="Изменение:", bootstyle="secondary").pack(anchor="w")
-        
-        if currency.get('last_price') and currency.get('current_price'):
-            change = currency['current_price'] - currency['last_price']
-            change_percent = (change / currency['last_price']) * 100
-            
-            if change > 0:
-                change_text = f"▲ +{change:.2f} (+{change_percent:.2f}%)"
-                change_color = "success"
-            elif change < 0:
-                change_text = f"▼ {change:.2f} ({change_percent:.2f}%)"
-                change_color = "danger"
-            else:
-                change_text = "→ 0.00 (0.00%)"
-                change_color = "secondary"
-        else:
-            change_text = "Нет данных"
-            change_color = "secondary"
-        
-        change_label = tb.Label(
-            change_frame,
-            text=change_text,
-            font=("Helvetica", 12),
-            bootstyle=change_color
-        )
-        change_label.pack(anchor="w")
-        
-        # Время последнего обновления
-        time_frame = tb.Frame(info_frame)
-        time_frame.pack(side=RIGHT)
-        
-        tb.Label(time_frame, text="Обновлено:", bootstyle="secondary").pack(anchor="w")
-        time_text = datetime.now().strftime("%H:%M:%S")
-        time_label = tb.Label(
-            time_frame,
-            text=time_text,
-            font=("Helvetica", 10),
-            bootstyle="info"
-        )
-        time_label.pack(anchor="w")
-        
-        # Сохраняем виджеты
-        self.currency_widgets[index] = {
-            'price_label': price_label,
-            'change_label': change_label,
-            'time_label': time_label
-        }
+        self.currency_index = {currency['code']: currency for currency in self.currencies}
+        self.core.set_codes(self.currency_index)
+        
+        # Длинные списки показываем виртуальным списком
+        virtual = len(self.currencies) > self.VIRTUAL_LIST_THRESHOLD
+        if self.cards is None or virtual != isinstance(self.cards, VirtualCurrencyCards):
+            if self.cards is not None:
+                self.cards.destroy()
+            self.cards = self.make_cards(virtual)
+        self.cards.sync(self.currencies)
     
-    def get_currency_price(self, currency_code):
-        """Отримання курсу валюти з Minfin"""
-        try:
-            url = f"https://minfin.com.ua/currency/{currency_code.lower()}/"
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Спроба знайти курс через різні селектори
-            selectors = [
-                'div[data-currency]',
-                'span.mfm-black-btn',
-                'div.mfm-posr',
-                'div.sc-1x32wa2-9',
-                'table tr td'
-            ]
-            
-            for selector in selectors:
-                elements = soup.select(selector)
-                for element in elements:
-                    text = element.get_text().strip()
-                    # Шукаємо число з плаваючою точкою
-                    import re
-                    matches = re.findall(r'\d+\.\d+', text.replace(',', '.'))
-                    if matches:
-                        try:
-                            price = float(matches[0])
-                            if 1 < price < 1000:  # Реалістичний діапазон для валют
-                                return price
-                        except:
-                            continue
-            
-            # Альтернативний метод - пошук за класами, які часто використовуються
-            price_divs = soup.find_all('div', class_=lambda x: x and 'rate' in str(x).lower())
-            for div in price_divs:
-                text = div.get_text().strip()
-                try:
-                    price = float(text.replace(',', '.'))
-                    if 1 < price < 1000:
-                        return price
-                except:
-                    continue
-            
-            return None
-        except Exception as e:
-            print(f"Помилка отримання курсу {currency_code}: {e}")
-            return None
+    def find_currency(self, code):
+        return self.currency_index.get(code)
     
     def show_chart(self, currency_code):
         """Показать график изменения курса"""
-        if currency_code not in self.price_history:
-            messagebox.showinfo("Информация", "Недостаточно данных для построения графика")
+        chart = self.chart_windows.get(currency_code)
+        if chart is not None:
+            chart.window.lift()
             return
         
-        history = self.price_history[currency_code]
-        if len(history) < 2:
+        times, prices = self.price_history.since(currency_code, time.time() - self.CHART_WINDOW)
+        if len(times) < 2:
             messagebox.showinfo("Информация", "Недостаточно данных для построения графика")
             return
         
-        # Создаем новое окно
-        chart_window = Toplevel(self.root)
-        chart_window.title(f"График {currency_code.upper()}")
-        chart_window.geometry("800x600")
+        self.chart_windows[currency_code] = ChartWindow(self, currency_code, times, prices)
+    
+    def show_alerts(self, currency_code):
+        """Правила оповещений валюты и последние срабатывания"""
+        alerts_window = Toplevel(self.root)
+        alerts_window.title(f"Оповещения {currency_code.upper()}")
+        alerts_window.geometry("600x500")
+        
+        frame = tb.Frame(alerts_window, padding=20)
+        frame.pack(fill=BOTH, expand=YES)
+        
+        # Новое правило
+        form = tb.Frame(frame)
+        form.pack(fill=X, pady=(0, 10))
+        
+        kind_names = {'above': "Выше", 'below': "Ниже", 'move': "Изменение, %"}
+        kind_var = tk.StringVar(value=kind_names['above'])
+        tb.Combobox(form, textvariable=kind_var, values=[kind_names[kind] for kind in KINDS], state="readonly", width=14).pack(side=LEFT, padx=(0, 10))
+        value_entry = tb.Entry(form, width=12)
+        value_entry.pack(side=LEFT, padx=(0, 10))
+        
+        rules_table = ttk.Treeview(frame, columns=("kind", "value"), show="headings", height=8)
+        rules_table.heading("kind", text="Условие")
+        rules_table.heading("value", text="Порог")
+        
+        def fill_rules():
+            rules_table.delete(*rules_table.get_children())
+            for rule in self.core.alerts.rules(currency_code):
+                rules_table.insert("", END, iid=str(rule.id), values=(kind_names[rule.kind], f"{rule.value:g}"))
+        
+        def add_rule():
+            kind = next(kind for kind, name in kind_names.items() if name == kind_var.get())
+            try:
+                value = float(value_entry.get().replace(',', '.'))
+            except ValueError:
+                messagebox.showerror("Ошибка", "Порог должен быть числом", parent=alerts_window)
+                return
+            self.core.alerts.add_rule(currency_code, kind, value)
+            value_entry.delete(0, END)
+            fill_rules()
+        
+        def remove_rules():
+            for item in rules_table.selection():
+                self.core.alerts.remove_rule(int(item))
+            fill_rules()
+        
+        tb.Button(form, text="Добавить", command=add_rule, bootstyle="success").pack(side=LEFT, padx=(0, 10))
+        tb.Button(form, text="Удалить", command=remove_rules, bootstyle="outline-danger").pack(side=LEFT)
+        rules_table.pack(fill=X)
+        fill_rules()
+        
+        # Журнал срабатываний
+        tb.Label(frame, text="Последние срабатывания:", bootstyle="secondary").pack(anchor="w", pady=(15, 5))
+        history = ttk.Treeview(frame, columns=("time", "price", "kind", "value"), show="headings")
+        for column, title in (("time", "Время"), ("price", "Курс"), ("kind", "Условие"), ("value", "Порог")):
+            history.heading(column, text=title)
+        for rule_id, code, kind, value, price, last_price, ts in self.core.history_store.alerts(currency_code, limit=50):
+            history.insert("", END, values=(
+                datetime.fromtimestamp(ts).strftime("%d.%m %H:%M:%S"), f"{price:.2f}", kind_names[kind], f"{value:g}"
+            ))
+        history.pack(fill=BOTH, expand=YES)
+    
+    def show_diagnostics(self):
+        """Окно метрик: задержки загрузки и разбора, кэш, интерфейс"""
+        diagnostics_window = Toplevel(self.root)
+        diagnostics_window.title("Диагностика")
+        diagnostics_window.geometry("900x500")
+        
+        frame = tb.Frame(diagnostics_window, padding=20)
+        frame.pack(fill=BOTH, expand=YES)
+        
+        columns = ("labels", "count", "p50", "p99", "value")
+        table = ttk.Treeview(frame, columns=columns, show="tree headings")
+        table.heading("#0", text="Метрика")
+        table.column("#0", width=220, anchor="w")
+        for column, title, width in (("labels", "Метки", 260), ("count", "Кол-во", 80),
+                                     ("p50", "p50", 90), ("p99", "p99", 90), ("value", "Значение", 100)):
+            table.heading(column, text=title)
+            table.column(column, width=width, anchor="w" if column == "labels" else "e")
+        table.pack(fill=BOTH, expand=YES)
+        
+        def fmt(value, seconds):
+            if value is None:
+                return "—"
+            return f"{value * 1000:.1f} мс" if seconds else f"{value:g}"
+        
+        def refresh():
+            if not diagnostics_window.winfo_exists():
+                return
+            snapshot = self.core.collect_metrics().snapshot()
+            table.delete(*table.get_children())
+            for item in snapshot['histograms']:
+                seconds = item['name'].endswith('_seconds')
+                labels = ", ".join(f"{key}={value}" for key, value in item['labels'].items())
+                table.insert("", END, text=item['name'], values=(
+                    labels, item['count'], fmt(item['p50'], seconds), fmt(item['p99'], seconds), fmt(item['sum'], seconds)
+                ))
+            for item in snapshot['counters'] + snapshot['gauges']:
+                labels = ", ".join(f"{key}={value}" for key, value in item['labels'].items())
+                table.insert("", END, text=item['name'], values=(labels, "", "", "", f"{item['value']:g}"))
+            table.insert("", END, text="ui_bus", values=(
+                "", "", "", "", f"{self.update_bus.posted}, объединено {self.update_bus.coalesced}"
+            ))
+            diagnostics_window.after(self.DIAGNOSTICS_REFRESH_MS, refresh)
+        
+        def export(fmt):
+            extension = ".json" if fmt == 'json' else ".prom"
+            path = filedialog.asksaveasfilename(parent=diagnostics_window, defaultextension=extension,
+                                                initialfile=f"metrics{extension}")
+            if path:
+                atomic_write(path, self.core.export_metrics(fmt))
+        
+        buttons = tb.Frame(frame)
+        buttons.pack(fill=X, pady=(10, 0))
+        tb.Button(buttons, text="Экспорт JSON", command=lambda: export('json'), bootstyle="info-outline").pack(side=LEFT)
+        tb.Button(buttons, text="Экспорт Prometheus", command=lambda: export('prometheus'), bootstyle="info-outline").pack(side=LEFT, padx=(10, 0))
+        refresh()
+    
+    def show_cross_rates(self):
+        """Таблица кросс-курсов отслеживаемых валют"""
+        if self.core.cross is None:
+            messagebox.showinfo("Информация", "Для кросс-курсов нужен NumPy")
+            return
         
-        # Фрейм для графика
-        chart_frame = tb.Frame(chart_window, padding=20)
-        chart_frame.pack(fill=BOTH, expand=YES)
+        codes, rates, changes = self.core.cross.matrix(['uah'] + list(self.currency_index))
+        if len(codes) < 2:
+            messagebox.showinfo("Информация", "Недостаточно данных для кросс-курсов")
+            return
         
-        # Создаем график
-        fig, ax = plt.subplots(figsize=(8, 6))
+        cross_window = Toplevel(self.root)
+        cross_window.title("Кросс-курсы")
+        cross_window.geometry("800x400")
         
-        times = [entry['time'] for entry in history]
-        prices = [entry['price'] for entry in history]
+        frame = tb.Frame(cross_window, padding=20)
+        frame.pack(fill=BOTH, expand=YES)
         
-        ax.plot(times, prices, marker='o', linestyle='-', color='#2196F3', linewidth=2, markersize=4)
-        ax.set_title(f'Изменение курса {currency_code.upper()}', fontsize=16, fontweight='bold')
-        ax.set_xlabel('Время', fontsize=12)
-        ax.set_ylabel('Курс (₴)', fontsize=12)
-        ax.grid(True, alpha=0.3)
+        tb.Label(frame, text="Сколько единиц валюты столбца стоит единица валюты строки", bootstyle="secondary").pack(anchor="w", pady=(0, 10))
         
-        # Форматирование оси X
-        ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
-        plt.setp(ax.xaxis.get_majorticklabels(), rotation=45)
+        columns = [code.upper() for code in codes]
+        table = ttk.Treeview(frame, columns=columns, show="tree headings")
+        table.column("#0", width=60, anchor="w")
+        for column in columns:
+            table.heading(column, text=column)
+            table.column(column, width=90, anchor="e")
         
-        # Добавляем график в окно
-        canvas = FigureCanvasTkAgg(fig, master=chart_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=BOTH, expand=YES)
+        for i, code in enumerate(codes):
+            values = []
+            for j in range(len(codes)):
+                rate, change = rates[i, j], changes[i, j]
+                if i == j or rate != rate:  # NaN - курса ещё нет
+                    values.append("—" if i != j else "1")
+                    continue
+                arrow = "▲" if change > 0 else "▼" if change < 0 else ""
+                values.append(f"{rate:.4f} {arrow}")
+            table.insert("", END, text=code.upper(), values=values)
+        table.pack(fill=BOTH, expand=YES)
     
-    def update_currencies(self):
-        """Обновление курсов всех валют"""
-        self.status_var.set("Обновление курсов...")
-        self.progress_var.set(0)
+    def update_currencies(self, codes=None):
+        """Обновление курсов всех валют или только указанных кодов"""
+        self.update_bus.post('status', "Обновление курсов...")
+        self.update_bus.post('progress', 0)
+        
+        if codes is None:
+            codes = list(self.currency_index)
         
         def update_thread():
-            total = len(self.currencies)
-            for i, currency in enumerate(self.currencies):
-                new_price = self.get_currency_price(currency['code'])
-                
-                if new_price:
-                    # Инициализируем историю если нужно
-                    if currency['code'] not in self.price_history:
-                        self.price_history[currency['code']] = deque(maxlen=50)
-                    
-                    # Добавляем в историю
-                    self.price_history[currency['code']].append({
-                        'time': datetime.now(),
-                        'price': new_price
-                    })
-                    
-                    # Обновляем цены
-                    currency['last_price'] = currency.get('current_price')
-                    currency['current_price'] = new_price
-                    
-                    # Обновляем интерфейс
-                    self.root.after(0, self.update_currency_display, i)
-                
-                # Обновляем прогресс
-                progress = (i + 1) / total * 100
-                self.root.after(0, lambda p=progress: self.progress_var.set(p))
+            def on_progress(done, total):
+                # Обновляем прогресс по мере готовности результатов
+                self.update_bus.post('progress', done / total * 100)
+            
+            self.core.refresh(codes, on_progress)
             
             # Обновляем статус
-            current_time = datetime.now().strftime("%H:%M:%S")
-            self.root.after(0, lambda: self.status_var.set(f"Последнее обновление: {current_time}"))
-            self.root.after(0, lambda: self.progress_var.set(0))
+            self.post_status()
+            self.update_bus.post('progress', 0)
         
         # Запускаем в отдельном потоке
         thread = threading.Thread(target=update_thread, daemon=True)
         thread.start()
     
-    def update_currency_display(self, index):
-        """Обновление отображения валюты"""
-        if index >= len(self.currencies) or index not in self.currency_widgets:
+    def on_tick(self, tick):
+        """Новый курс из фонового потока - в очередь интерфейса"""
+        self.update_bus.post(('rate', tick.code), tick)
+    
+    def on_alert(self, alert):
+        """Сработавшее оповещение из фонового потока - в очередь интерфейса"""
+        self.update_bus.post(('alert', alert.rule.id), alert)
+    
+    def post_status(self):
+        current_time = datetime.now().strftime("%H:%M:%S")
+        self.update_bus.post('status', f"Последнее обновление: {current_time} | {self.traffic_summary()}")
+    
+    def drain_updates(self):
+        """Применение накопленных обновлений в потоке Tk в пределах бюджета кадра"""
+        started = time.perf_counter()
+        deadline = started + self.UI_FRAME_BUDGET
+        applied = 0
+        while time.perf_counter() < deadline:
+            batch = self.update_bus.drain(32)
+            if not batch:
+                break
+            applied += len(batch)
+            for key, value in batch:
+                if key == 'status':
+                    self.status_var.set(value)
+                elif key == 'progress':
+                    self.progress_var.set(value)
+                elif key[0] == 'alert':
+                    self.root.bell()
+                    self.status_var.set(f"🔔 {describe(value)}")
+                else:
+                    self.apply_tick(value)
+        if applied:
+            metrics = self.core.metrics
+            metrics.observe('ui_batch_size', applied, buckets=SIZE_BUCKETS)
+            metrics.observe('ui_drain_seconds', time.perf_counter() - started)
+        self.root.after(self.UI_FRAME_MS, self.drain_updates)
+    
+    def probe_loop_lag(self, expected=None):
+        """Насколько позже срока Tk выполняет after: задержка цикла событий"""
+        now = time.perf_counter()
+        if expected is not None:
+            self.core.metrics.observe('tk_loop_lag_seconds', max(now - expected, 0.0))
+        self.root.after(self.LAG_PROBE_MS, self.probe_loop_lag, now + self.LAG_PROBE_MS / 1000)
+    
+    def apply_tick(self, tick):
+        currency = self.find_currency(tick.code)
+        if currency is None:
             return
-            
-        currency = self.currencies[index]
-        widgets = self.currency_widgets[index]
-        
-        if widgets.get('price_label'):
-            price_text = f"{currency['current_price']:.2f} ₴" if currency['current_price'] else "Ошибка"
-            widgets['price_label'].config(text=price_text)
-        
-        if widgets.get('change_label') and currency.get('last_price') and currency.get('current_price'):
-            change = currency['current_price'] - currency['last_price']
-            change_percent = (change / currency['last_price']) * 100 if currency['last_price'] else 0
-            
-            if change > 0:
-                change_text = f"▲ +{change:.2f} (+{change_percent:.2f}%)"
-                change_color = "success"
-            elif change < 0:
-                change_text = f"▼ {change:.2f} ({change_percent:.2f}%)"
-                change_color = "danger"
-            else:
-                change_text = "→ 0.00 (0.00%)"
-                change_color = "secondary"
-            
-            widgets['change_label'].config(text=change_text, bootstyle=change_color)
-        elif widgets.get('change_label'):
-            widgets['change_label'].config(text="Нет данных", bootstyle="secondary")
-        
-        # Обновляем время
-        if widgets.get('time_label'):
-            time_text = datetime.now().strftime("%H:%M:%S")
-            widgets['time_label'].config(text=time_text)
+        currency['stale'] = tick.stale
+        if tick.stale:
+            # Курс прежний, только пометка на карточке
+            self.update_currency_display(tick.code)
+            return
+        currency['last_price'] = tick.last_price if tick.last_price is not None else currency.get('current_price')
+        currency['current_price'] = tick.price
+        currency['stats'] = tick.stats
+        self.watchlist_saver.record_price(tick.code, currency['last_price'], tick.price)
+        self.update_currency_display(tick.code)
+        
+        chart = self.chart_windows.get(tick.code)
+        if chart is not None:
+            chart.append(tick.fetched_at, tick.price)
+    
+    def traffic_summary(self):
+        """Краткая статистика трафика для статус-бара"""
+        stats = self.core.http.stats()
+        summary = (
+            f"трафик {stats['bytes_wire'] / 1024:.1f} КБ, "
+            f"сэкономлено {stats['bytes_saved'] / 1024:.1f} КБ (304: {stats['not_modified']}), "
+            f"соединений переиспользовано: {stats['connections_reused']}"
+        )
+        if stats['circuits_open'] or self.core.stale_codes:
+            summary += f" | источник недоступен, устаревших курсов: {len(self.core.stale_codes)}"
+        return summary
+    
+    def update_currency_display(self, code):
+        """Обновление отображения валюты"""
+        currency = self.find_currency(code)
+        if currency:
+            self.cards.refresh(currency)
     
     def add_currency(self):
         """Добавление новой валюты"""
@@ -597,35 +1100,42 @@ class CurrencyTracker:
         self.save_currencies()
         self.update_currency_list()
         
-        # Обновляем курс новой валюты
-        self.update_currencies()
+        # Загружаем курс только новой валюты
+        self.update_currencies([code])
         
         self.currency_entry.delete(0, tk.END)
         self.currency_entry.insert(0, "usd")  # Сбрасываем к умолчанию
         messagebox.showinfo("Успех", f"Валюта {name} добавлена успешно")
     
-    def remove_currency(self, index):
+    def remove_currency(self, code):
         """Удаление валюты"""
-        if 0 <= index < len(self.currencies):
-            currency_name = self.currencies[index]['name']
-            if messagebox.askyesno("Подтверждение", f"Удалить {currency_name}?"):
-                # Удаляем валюту
-                del self.currencies[index]
-                # Очищаем индексированные виджеты
-                self.currency_widgets = {}
-                
-                self.save_currencies()
-                self.update_currency_list()
+        currency = self.find_currency(code)
+        if currency is None:
+            return
+        if messagebox.askyesno("Подтверждение", f"Удалить {currency['name']}?"):
+            # Удаляем валюту, её историю и скользящую статистику из памяти
+            self.price_history.discard(code)
+            self.core.analytics.discard(code)
+            self.currencies.remove(currency)
+            
+            self.save_currencies()
+            self.update_currency_list()
+    
+    def start_updates(self):
+        """Первая загрузка курсов и автообновление"""
+        self.update_currencies()
+        self.start_auto_update()
     
     def start_auto_update(self):
         """Запуск автоматичного оновлення"""
-        def auto_update():
-            while True:
-                time.sleep(300)  # Оновлення кожні 5 хвилин
-                self.update_currencies()
-        
-        thread = threading.Thread(target=auto_update, daemon=True)
-        thread.start()
+        # Кожна валюта опитується за своїм розкладом, див. RefreshScheduler
+        self.core.start_scheduler(lambda code, rate: self.post_status())
+    
+    def on_close(self):
+        """Сохранение истории и закрытие окна"""
+        self.watchlist_saver.close()
+        self.core.close()
+        self.root.destroy()
 
 def main():
     root = tb.Window(themename="darkly")